@@ -0,0 +1,38 @@
+'''
+Benchmarks of serving the homepage, with the release lists rendered from the
+database (cold cache) and from the template fragment cache (warm cache).
+'''
+import pytest
+from django.core.cache import cache
+from django.urls import reverse
+
+from trendingAlbums.models import publishGeneration
+from trendingAlbums.tests.factories import RefreshGenerationFactory, SpotifyAlbumFactory
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def releases():
+    generation = RefreshGenerationFactory()
+    SpotifyAlbumFactory.create_batch(30, generation=generation, album_type='album')
+    SpotifyAlbumFactory.create_batch(60, generation=generation, album_type='single')
+    publishGeneration(generation)
+    return generation
+
+
+def bench_homepage_cold_cache(benchmark, client, releases):
+    def setup():
+        cache.clear()
+
+    response = benchmark.pedantic(client.get, args=(reverse('home'),), setup=setup, rounds=20)
+
+    assert response.status_code == 200
+
+
+def bench_homepage_warm_cache(benchmark, client, releases):
+    client.get(reverse('home'))
+
+    response = benchmark(client.get, reverse('home'))
+
+    assert response.status_code == 200
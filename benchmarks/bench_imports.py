@@ -0,0 +1,105 @@
+'''
+Cold start of a web worker: importing config.wsgi and the URLconf in a fresh
+interpreter, as a gunicorn worker does before its first request. Reports the
+wall time, the peak RSS and whether any of the Reddit or Spotify client code
+was loaded, which only the ingestion worker needs.
+
+The slowest top level imports come from python -X importtime, which only
+exists from Python 3.7 on. The project runs on Python 3.6, where the flag is
+ignored, so there only the wall time and RSS numbers apply.
+
+    $ python -m benchmarks.bench_imports --runs 5 --settings config.settings.production
+
+bench_worker_boot times the same for the benchmark suite, see
+benchmarks/pytest.ini.
+'''
+import argparse
+import os
+import subprocess
+import sys
+import time
+from collections import namedtuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules a web worker should never import
+INGESTION_MODULES = ('praw', 'prawcore', 'spotipy', 'trendingAlbums.reddit', 'trendingAlbums.releases',
+                     'trendingAlbums.spotify', 'trendingAlbums.lookups')
+
+WORKER_BOOT = '''
+import resource, sys
+import config.wsgi
+from django.urls import get_resolver
+get_resolver().url_patterns
+print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+print(' '.join(module for module in {0!r} if module in sys.modules))
+'''.format(INGESTION_MODULES)
+
+workerBoot = namedtuple('workerBoot', ['seconds', 'maxrss_kb', 'ingestion_modules', 'imports'])
+
+
+def parseImportTime(output):
+    '''
+    :param output (string): What python -X importtime wrote to stderr
+    :return (list): (cumulative microseconds, module) of every top level
+        import, slowest first
+    '''
+    imports = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, module = line[len('import time:'):].split('|')
+        # Nested imports are indented below the module that imported them
+        if cumulative.strip().isdigit() and not module.startswith('  '):
+            imports.append((int(cumulative), module.strip()))
+    return sorted(imports, reverse=True)
+
+
+def bootWorker(settings_module=None):
+    '''
+    :param settings_module (string): Defaults to DJANGO_SETTINGS_MODULE, or
+        the production settings like config.wsgi
+    :return (workerBoot): How long the boot took, the peak RSS in kilobytes, the
+        INGESTION_MODULES that were loaded and the top level imports
+    '''
+    env = dict(os.environ)
+    if settings_module is not None:
+        env['DJANGO_SETTINGS_MODULE'] = settings_module
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', WORKER_BOOT], cwd=ROOT, env=env,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+    seconds = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError('The worker did not boot:\n' + result.stderr[-2000:])
+
+    maxrss, loaded = (result.stdout.splitlines() + [''])[:2]
+    return workerBoot(seconds, int(maxrss), loaded.split(), parseImportTime(result.stderr))
+
+
+def bench_worker_boot(benchmark):
+    boot = benchmark.pedantic(bootWorker, rounds=5)
+
+    benchmark.extra_info['maxrss_kb'] = boot.maxrss_kb
+    assert boot.ingestion_modules == []
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5, help='Worker boots, the fastest one is reported')
+    parser.add_argument('--settings', help='Settings module, defaults to DJANGO_SETTINGS_MODULE')
+    parser.add_argument('--top', type=int, default=15, help='Number of top level imports listed')
+    args = parser.parse_args()
+
+    boots = [bootWorker(args.settings) for _ in range(args.runs)]
+    best = min(boots, key=lambda boot: boot.seconds)
+    print('boot {0:8.1f} ms  peak rss {1:8.1f} MiB'.format(best.seconds * 1000, best.maxrss_kb / 1024))
+    print('ingestion modules loaded: {0}'.format(', '.join(best.ingestion_modules) or 'none'))
+
+    if not best.imports:
+        print('python -X importtime needs Python 3.7 or later')
+    for cumulative, module in best.imports[:args.top]:
+        print('{0:8.1f} ms  {1}'.format(cumulative / 1000, module))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+'''
+Benchmarks of the weekly refresh: staging the crawled posts, saving them with
+their matches, and the whole refresh against synthetic Reddit and Spotify
+clients.
+'''
+from unittest import mock
+
+import pytest
+from django.core.cache import cache
+
+from benchmarks.stubs import syntheticClients, syntheticSubmissions
+from trendingAlbums.models import refreshGeneration, spotifyAlbum
+from trendingAlbums.reddit import filterFreshOnly, saveRedditPosts, toRedditRecord
+from trendingAlbums.releases import getSpotifyAlbums, saveMatches
+
+pytestmark = pytest.mark.django_db
+
+SIZES = [50, 500, 5000]
+
+
+@pytest.mark.parametrize('count', SIZES)
+def bench_record_staging(benchmark, count):
+    submissions = syntheticSubmissions(count)
+
+    fresh = benchmark(lambda: list(filterFreshOnly(toRedditRecord(submission) for submission in submissions)))
+
+    assert len(fresh) == count - count // 4
+
+
+@pytest.mark.parametrize('count', SIZES)
+def bench_persistence(benchmark, count):
+    records = [toRedditRecord(submission) for submission in syntheticSubmissions(count)]
+
+    def setup():
+        generation = refreshGeneration.objects.create(week='2018-08-02')
+        matches = {record.id: spotifyAlbum(generation=generation, artist='Artist', name=record.title,
+                                           release='2018-08-03T00:00:00Z', url=record.url,
+                                           uri='spotify:album:' + record.id, image_url=record.url,
+                                           album_type='single')
+                   for record in records}
+        return (generation, matches), {}
+
+    def persist(generation, matches):
+        saveRedditPosts(generation, records)
+        posts = list(generation.posts.all())
+        return saveMatches(generation, posts, matches)
+
+    assert benchmark.pedantic(persist, setup=setup, rounds=5) == count
+
+
+@pytest.mark.parametrize('count', SIZES[:2])
+def bench_refresh(benchmark, settings, count):
+    settings.REDDIT_CRAWL_LISTINGS = ['hot']
+    settings.REDDIT_CRAWL_MAX_PAGES = count
+    subreddit, spotify = syntheticClients(count, settings.REDDIT_CRAWL_PAGE_SIZE)
+
+    def setup():
+        # Every round resolves all posts again instead of reusing the matches
+        # and lookups of the previous one
+        refreshGeneration.objects.all().delete()
+        cache.clear()
+
+    with mock.patch('trendingAlbums.reddit.getSubreddit', return_value=subreddit), \
+            mock.patch('trendingAlbums.releases.getSpotifyClient', return_value=spotify):
+        generation = benchmark.pedantic(getSpotifyAlbums, setup=setup, rounds=5)
+
+    assert generation.albums.count() == count - count // 4
@@ -0,0 +1,82 @@
+'''
+Micro-benchmark of the FRESH title parsing against the prefix checks it
+replaced. titles.txt holds post titles as they appear on r/hiphopheads, it is
+repeated to get a corpus the size of a busy release night crawl.
+
+    $ python -m benchmarks.bench_titles --repeat 1000
+
+The bench_ functions time the same for the benchmark suite, see
+benchmarks/pytest.ini.
+'''
+import argparse
+import os
+import timeit
+
+from trendingAlbums.titles import parseTitle
+
+CORPUS = os.path.join(os.path.dirname(__file__), 'titles.txt')
+
+
+def loadTitles(path=CORPUS):
+    '''
+    :return (list): The post titles of the corpus, one per line
+    '''
+    with open(path, encoding='utf-8') as corpus:
+        return [line.rstrip('\n') for line in corpus if line.strip()]
+
+
+def prefixParse(title):
+    '''
+    The former checkFresh and title splitting, kept as the baseline
+    '''
+    if title[:7] == "[FRESH]":
+        seperate = title[8:].split(' - ')
+    elif title[:10] == "[FRESH EP]":
+        seperate = title[11:].split(' - ')
+    elif title[:13] == "[FRESH ALBUM]":
+        seperate = title[14:].split(' - ')
+    else:
+        return None
+    return seperate if len(seperate) == 2 else None
+
+
+def classifierParse(title):
+    '''
+    parseTitle without its cache, every title is parsed again
+    '''
+    return parseTitle.__wrapped__(title)
+
+
+def bench_classifier(benchmark):
+    titles = loadTitles() * 100
+    releases = benchmark(lambda: sum(1 for title in titles if classifierParse(title) is not None))
+    assert releases > len(titles) / 2
+
+
+def bench_cached_classifier(benchmark):
+    titles = loadTitles() * 100
+    parseTitle.cache_clear()
+    releases = benchmark(lambda: sum(1 for title in titles if parseTitle(title) is not None))
+    assert releases > len(titles) / 2
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=1000, help='Times the corpus is repeated')
+    parser.add_argument('--runs', type=int, default=5, help='Timed runs, the fastest one is reported')
+    args = parser.parse_args()
+
+    titles = loadTitles() * args.repeat
+    print('{0} titles'.format(len(titles)))
+
+    for name, parse in (('prefix checks', prefixParse), ('compiled classifier', classifierParse),
+                        ('cached classifier', parseTitle)):
+        parseTitle.cache_clear()
+        best = min(timeit.repeat(lambda: [parse(title) for title in titles], number=1, repeat=args.runs))
+        found = sum(1 for title in titles if parse(title) is not None)
+        print('{0:<20} {1:8.1f} ms  {2:6.0f} ns/title  {3} releases'.format(
+            name, best * 1000, best / len(titles) * 1e9, found))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+'''
+Synthetic Reddit and Spotify responses for the benchmarks, served by the
+replaying clients of trendingAlbums.replay without any network access.
+'''
+import time
+
+from django.utils import timezone
+
+from trendingAlbums.replay import Cassette, ReplaySpotify, ReplaySubreddit, callKey, replaySubmission
+
+
+def syntheticTitle(n):
+    '''
+    :return (string): The title of the n-th post, every fourth one is no release
+    '''
+    if n % 4 == 3:
+        return '[DISCUSSION] Best verse of the week #{0}'.format(n)
+    tag = ('[FRESH]', '[FRESH EP]', '[FRESH ALBUM]')[n % 4]
+    return '{0} Artist {1} - Release {1} (feat. Guest {1})'.format(tag, n)
+
+
+def syntheticSubmissions(count):
+    '''
+    :return (list): count submissions posted during the last day, newest first
+    '''
+    now = time.time()
+    return [replaySubmission(title=syntheticTitle(n), score=count - n, id='b{0}'.format(n),
+                             fullname='t3_b{0}'.format(n), url='https://reddit.com/b{0}'.format(n),
+                             num_comments=n % 50, created=now - n * 10, created_utc=now - n * 10)
+            for n in range(count)]
+
+
+class SyntheticSpotify(ReplaySpotify):
+    '''
+    Replays the searches from a cassette and answers the several albums
+        requests per id, however the ids are batched
+    '''
+
+    def __init__(self, cassette, full_albums, latency=0.0):
+        super(SyntheticSpotify, self).__init__(cassette, latency)
+        self.full_albums = full_albums
+
+    def albums(self, ids):
+        if self.latency:
+            time.sleep(self.latency)
+        return {'albums': [self.full_albums.get(album_id) for album_id in ids]}
+
+
+def syntheticClients(count, page_size, latency=0.0):
+    '''
+    Clients for a refresh that crawls count posts from the hot listing and
+        matches every release post on Spotify.
+
+    :param count (int): Number of posts on r/hiphopheads
+    :param page_size (int): The REDDIT_CRAWL_PAGE_SIZE the refresh runs with
+    :param latency (float): Seconds every response is delayed by
+    :return (tuple): The subreddit and the Spotify client
+    '''
+    reddit = Cassette('reddit.json')
+    submissions = syntheticSubmissions(count)
+    for start in range(0, count, page_size):
+        params = {'after': submissions[start - 1].fullname} if start else {}
+        reddit.record(callKey('hot', limit=page_size, params=params),
+                      [submission._asdict() for submission in submissions[start:start + page_size]])
+
+    spotify = Cassette('spotify.json')
+    full_albums = {}
+    released = timezone.localdate().isoformat()
+    for n, submission in enumerate(submissions):
+        if n % 4 == 3:
+            continue
+        album_type = 'album' if n % 4 == 2 else 'single'
+        album = {'id': 'a{0}'.format(n), 'uri': 'spotify:album:a{0}'.format(n), 'name': 'Release {0}'.format(n),
+                 'album_type': album_type, 'release_date': released,
+                 'images': [{'url': 'https://i.scdn.co/640/{0}'.format(n)},
+                            {'url': 'https://i.scdn.co/300/{0}'.format(n)}]}
+        spotify.record(callKey('search', q='artist:Artist {0}'.format(n), type='artist'),
+                       {'artists': {'total': 1, 'items': [{'id': 'r{0}'.format(n)}]}})
+        spotify.record(callKey('artist_albums', 'r{0}'.format(n), album_type=album_type),
+                       {'items': [dict(album, name='Older Release {0}'.format(n), id='o{0}'.format(n),
+                                       release_date='2016-09-16'), album]})
+        full_albums[album['id']] = dict(album, tracks={'total': 12})
+    return ReplaySubreddit(reddit, latency), SyntheticSpotify(spotify, full_albums, latency)
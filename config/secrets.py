@@ -0,0 +1,39 @@
+"""
+Secrets of the deployment. They are read from the environment first and only
+fall back to secrets.json, which is read the first time a secret is missing
+from the environment, so a process configured through its environment never
+touches the file. Every secret is looked up once per process.
+"""
+
+import json
+import os
+from functools import lru_cache
+
+from django.core.exceptions import ImproperlyConfigured
+
+SECRETS_FILE = os.environ.get(
+    'DJANGO_SECRETS_FILE', os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'secrets.json'))
+
+
+@lru_cache(maxsize=1)
+def secretsFile():
+    '''
+    :return (dict): The secrets in SECRETS_FILE, empty if there is no such file
+    '''
+    try:
+        with open(SECRETS_FILE) as f:
+            return json.loads(f.read())
+    except FileNotFoundError:
+        return {}
+
+
+@lru_cache(maxsize=None)
+def get_secret(setting):
+    '''Get the secret variable or return explicit exception.'''
+    if setting in os.environ:
+        return os.environ[setting]
+    try:
+        return secretsFile()[setting]
+    except KeyError:
+        err_msg = 'Set the {0} environment variable'.format(setting)
+        raise ImproperlyConfigured(err_msg)
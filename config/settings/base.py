@@ -4,23 +4,7 @@ Base settings to build other settings files upon.
 
 import environ
 
-import json
-
-from django.core.exceptions import ImproperlyConfigured
-
-
-with open('secrets.json') as f:
-    secrets = json.loads(f.read())
-
-
-
-def get_secret(setting, secrets = secrets):
-    '''Get the secret variable or return explicit exception.'''
-    try:
-        return secrets[setting]
-    except KeyError:
-        err_msg = 'Set the {0} environment variable'.format(setting)
-        raise ImproperlyConfigured(err_msg)
+from config.secrets import get_secret  # noqa F401 also used by the other settings modules
 
 
 ROOT_DIR = environ.Path(__file__) - 3  # (weekly_drop/config/settings/base.py - 3 = weekly_drop/)
@@ -28,7 +12,7 @@ APPS_DIR = ROOT_DIR.path('weekly_drop')
 
 env = environ.Env()
 
-READ_DOT_ENV_FILE = env('DJANGO_READ_DOT_ENV_FILE', default=get_secret('DJANGO_READ_DOT_ENV_FILE'))
+READ_DOT_ENV_FILE = get_secret('DJANGO_READ_DOT_ENV_FILE')
 if READ_DOT_ENV_FILE:
     # OS environment variables take precedence over variables from .env
     env.read_env(str(ROOT_DIR.path('.env')))
@@ -58,7 +42,7 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/dev/ref/settings/#databases
 
 DATABASES = {
-    'default': env.db('DATABASE_URL', default=get_secret('DATABASE_URL')),
+    'default': env.db_url_config(get_secret('DATABASE_URL')),
 }
 DATABASES['default']['ATOMIC_REQUESTS'] = True
 
@@ -148,6 +132,7 @@ AUTH_PASSWORD_VALIDATORS = [
 # ------------------------------------------------------------------------------
 # https://docs.djangoproject.com/en/dev/ref/settings/#middleware
 MIDDLEWARE = [
+    'trendingAlbums.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -227,7 +212,7 @@ FIXTURE_DIRS = (
 # EMAIL
 # ------------------------------------------------------------------------------
 # https://docs.djangoproject.com/en/dev/ref/settings/#email-backend
-EMAIL_BACKEND = env('DJANGO_EMAIL_BACKEND', default=get_secret('DJANGO_EMAIL_BACKEND'))
+EMAIL_BACKEND = get_secret('DJANGO_EMAIL_BACKEND')
 
 # ADMIN
 # ------------------------------------------------------------------------------
@@ -258,3 +243,93 @@ SOCIALACCOUNT_ADAPTER = 'weekly_drop.users.adapters.SocialAccountAdapter'
 
 # Your stuff...
 # ------------------------------------------------------------------------------
+# Seconds the refresh worker (manage.py refreshalbums --loop) waits between
+# two checks for the new weekly releases
+REFRESH_POLL_INTERVAL = env.int('REFRESH_POLL_INTERVAL', default=300)
+# Seconds after which the single-flight refresh lock expires even if its holder
+# never released it. The refresh extends it before every page and chunk it
+# saves, so it has to outlast the slowest one. The lock lives in the default
+# cache, so it is only shared between processes with a shared backend such as
+# Redis in production.
+REFRESH_LOCK_TIMEOUT = env.int('REFRESH_LOCK_TIMEOUT', default=60 * 30)
+# Number of Spotify requests the weekly refresh sends concurrently
+SPOTIFY_CONCURRENCY = env.int('SPOTIFY_CONCURRENCY', default=8)
+# How often a rate limited (429) or failed (5xx) Spotify request is retried
+SPOTIFY_MAX_RETRIES = env.int('SPOTIFY_MAX_RETRIES', default=5)
+# Seconds before a single Spotify request times out
+SPOTIFY_TIMEOUT = env.int('SPOTIFY_TIMEOUT', default=10)
+# Seconds Spotify artist searches are cached for, artist ids rarely change
+SPOTIFY_ARTIST_CACHE_TTL = env.int('SPOTIFY_ARTIST_CACHE_TTL', default=60 * 60 * 24 * 30)
+# Seconds the releases of an artist and album searches are cached for. Keep this
+# well below a week, otherwise the new releases of a returning artist are missed.
+SPOTIFY_RELEASE_CACHE_TTL = env.int('SPOTIFY_RELEASE_CACHE_TTL', default=60 * 60 * 6)
+# Number of rows the refresh inserts per INSERT statement
+INGESTION_BATCH_SIZE = env.int('INGESTION_BATCH_SIZE', default=500)
+# Number of weeks of past refreshes kept in the database before they are pruned
+REFRESH_HISTORY_WEEKS = env.int('REFRESH_HISTORY_WEEKS', default=4)
+# Seconds the rendered album and single lists of the homepage are cached for.
+# The cache key contains the version of the shown generation, so a refresh
+# invalidates it right away.
+HOMEPAGE_CACHE_TIMEOUT = env.int('HOMEPAGE_CACHE_TIMEOUT', default=60 * 60 * 24 * 7)
+# Seconds the shown generation and the time of the next refresh are cached for.
+# Publishing a generation replaces the entry, the timeout only matters with a
+# cache that is not shared between the worker and the web processes (locmem).
+REFRESH_STATE_CACHE_TIMEOUT = env.int('REFRESH_STATE_CACHE_TIMEOUT', default=60)
+# Reddit listings of r/hiphopheads the refresh crawls for new releases, in order:
+# any of hot, new and search (a title search sorted by new)
+REDDIT_CRAWL_LISTINGS = env.list('REDDIT_CRAWL_LISTINGS', default=['hot', 'new', 'search'])
+# Submissions per page of a listing, reddit returns at most 100
+REDDIT_CRAWL_PAGE_SIZE = env.int('REDDIT_CRAWL_PAGE_SIZE', default=100)
+# Pages read per listing at most, also bounds how long a refresh crawls
+REDDIT_CRAWL_MAX_PAGES = env.int('REDDIT_CRAWL_MAX_PAGES', default=10)
+# Days back a post can be from and still count as a new release. A listing is
+# no longer read once a whole page is older than that.
+REDDIT_CRAWL_WINDOW_DAYS = env.int('REDDIT_CRAWL_WINDOW_DAYS', default=7)
+# Query of the search listing
+REDDIT_SEARCH_QUERY = env('REDDIT_SEARCH_QUERY', default='title:FRESH')
+# Set when manage.py streamreleases runs next to the refresh worker. The shown
+# releases can then change at any time, so the homepage is only cached by
+# browsers and edge caches for REDDIT_STREAM_MAX_AGE seconds.
+REDDIT_STREAM_ENABLED = env.bool('REDDIT_STREAM_ENABLED', default=False)
+REDDIT_STREAM_MAX_AGE = env.int('REDDIT_STREAM_MAX_AGE', default=60)
+# Streamed FRESH posts waiting to be resolved at most, the stream is not read
+# while the queue is full
+REDDIT_STREAM_QUEUE_SIZE = env.int('REDDIT_STREAM_QUEUE_SIZE', default=100)
+# Streamed posts resolved together at most, and seconds a batch waits for more
+# posts after its first one arrived
+REDDIT_STREAM_BATCH_SIZE = env.int('REDDIT_STREAM_BATCH_SIZE', default=10)
+REDDIT_STREAM_BATCH_WAIT = env.int('REDDIT_STREAM_BATCH_WAIT', default=5)
+# Seconds the stream waits before asking reddit for new posts again
+REDDIT_STREAM_PAUSE = env.int('REDDIT_STREAM_PAUSE', default=5)
+# Seconds full Spotify albums (release date, track count and cover art) are
+# cached for, they hardly change once an album is out
+SPOTIFY_ALBUM_CACHE_TTL = env.int('SPOTIFY_ALBUM_CACHE_TTL', default=60 * 60 * 24 * 7)
+# Lowest similarity, from 0 to 1, between the release title of a post and of a
+# Spotify release for them to be matched
+SPOTIFY_MATCH_THRESHOLD = env.float('SPOTIFY_MATCH_THRESHOLD', default=0.8)
+# Dotted paths of the functions building the Reddit subreddit and the Spotify
+# client the refresh talks to. trendingAlbums.replay has recording and
+# replaying ones, manage.py replayrefresh switches to those.
+REDDIT_CLIENT_FACTORY = env('REDDIT_CLIENT_FACTORY', default='trendingAlbums.reddit.buildSubreddit')
+SPOTIFY_CLIENT_FACTORY = env('SPOTIFY_CLIENT_FACTORY', default='trendingAlbums.spotify.buildSpotifyClient')
+# Directory of the recorded Reddit and Spotify responses the replaying clients
+# answer from, and seconds every replayed response is delayed by to stand in
+# for the network
+REPLAY_CASSETTE_DIR = env('REPLAY_CASSETTE_DIR', default=str(ROOT_DIR.path('trendingAlbums', 'tests', 'cassettes')))
+REPLAY_LATENCY = env.float('REPLAY_LATENCY', default=0.0)
+# Bearer token Prometheus scrapes /metrics/ with, the metrics of the last
+# refresh are not served at all while it is empty
+METRICS_TOKEN = env('METRICS_TOKEN', default='')
+# Request profiling, meant for staging. When enabled every
+# PROFILING_SAMPLE_RATE-th request to one of the PROFILING_VIEWS ('namespace:*'
+# matches a whole namespace), and every request sending the PROFILING_HEADER,
+# is profiled. Requests slower than PROFILING_SLOW_MS milliseconds leave a
+# cProfile dump in PROFILING_DUMP_DIR.
+PROFILING_ENABLED = env.bool('PROFILING_ENABLED', default=False)
+PROFILING_SAMPLE_RATE = env.int('PROFILING_SAMPLE_RATE', default=100)
+PROFILING_HEADER = env('PROFILING_HEADER', default='X-Profile')
+PROFILING_VIEWS = env.list('PROFILING_VIEWS', default=['home', 'users:*'])
+PROFILING_SLOW_MS = env.int('PROFILING_SLOW_MS', default=500)
+PROFILING_DUMP_DIR = env('PROFILING_DUMP_DIR', default=str(ROOT_DIR.path('profiles')))
+# Releases per page of the JSON Api
+API_PAGE_SIZE = env.int('API_PAGE_SIZE', default=50)
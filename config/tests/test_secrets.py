@@ -0,0 +1,49 @@
+import json
+
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+
+from config import secrets
+
+
+@pytest.fixture
+def secrets_file(tmpdir, monkeypatch):
+    path = tmpdir.join("secrets.json")
+    path.write(json.dumps({"SPOTIFY_CLIENT_ID": "from-file"}))
+    monkeypatch.setattr(secrets, "SECRETS_FILE", str(path))
+    secrets.secretsFile.cache_clear()
+    secrets.get_secret.cache_clear()
+    yield path
+    secrets.secretsFile.cache_clear()
+    secrets.get_secret.cache_clear()
+
+
+def test_environment_comes_first(secrets_file, monkeypatch):
+    monkeypatch.setenv("SPOTIFY_CLIENT_ID", "from-env")
+
+    assert secrets.get_secret("SPOTIFY_CLIENT_ID") == "from-env"
+    # The file is not read while the environment has every secret
+    assert secrets.secretsFile.cache_info().currsize == 0
+
+
+def test_falls_back_to_file(secrets_file, monkeypatch):
+    monkeypatch.delenv("SPOTIFY_CLIENT_ID", raising=False)
+
+    assert secrets.get_secret("SPOTIFY_CLIENT_ID") == "from-file"
+
+
+def test_secrets_are_looked_up_once(secrets_file, monkeypatch):
+    monkeypatch.delenv("SPOTIFY_CLIENT_ID", raising=False)
+    secrets.get_secret("SPOTIFY_CLIENT_ID")
+    secrets_file.remove()
+    monkeypatch.setenv("SPOTIFY_CLIENT_ID", "changed")
+
+    assert secrets.get_secret("SPOTIFY_CLIENT_ID") == "from-file"
+
+
+def test_missing_secret(secrets_file, monkeypatch):
+    secrets_file.remove()
+    monkeypatch.delenv("SPOTIFY_CLIENT_SECRET", raising=False)
+
+    with pytest.raises(ImproperlyConfigured, match="SPOTIFY_CLIENT_SECRET"):
+        secrets.get_secret("SPOTIFY_CLIENT_SECRET")
@@ -1,7 +1,9 @@
 from django.contrib import admin
-from .models import redditPost, spotifyAlbum
+from .models import crawlCheckpoint, redditPost, refreshGeneration, refreshState, spotifyAlbum
 
 # Register your models here.
 admin.site.register(redditPost)
 admin.site.register(spotifyAlbum)
-
+admin.site.register(refreshGeneration)
+admin.site.register(refreshState)
+admin.site.register(crawlCheckpoint)
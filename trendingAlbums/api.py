@@ -0,0 +1,121 @@
+'''
+Read-only JSON Api of the weekly releases, for consumers that would otherwise
+scrape the homepage. Both lists show the generation that is shown now, or the
+one of an earlier week with ?week=YYYY-MM-DD, and can be revalidated with the
+generation's ETag like the homepage.
+'''
+from django.conf import settings
+from django.utils.dateparse import parse_date
+from django.utils.decorators import method_decorator
+from rest_framework import generics
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination
+from rest_framework.renderers import JSONRenderer
+
+from .caching import conditionalReleases, generationETag, requestGeneration
+from .models import weekGeneration
+from .serializers import RedditPostSerializer, SpotifyAlbumSerializer, modelFields
+
+
+def apiGeneration(request):
+    '''
+    :param request (HttpRequest): The Django or Rest framework request
+    :return (refreshGeneration): The generation of the requested week, only
+        looked up once per request
+    '''
+    request = getattr(request, '_request', request)
+    if not hasattr(request, '_api_generation'):
+        week = request.GET.get('week')
+        if week is None:
+            generation = requestGeneration(request)
+        else:
+            try:
+                day = parse_date(week)
+            except ValueError:
+                day = None
+            if day is None:
+                raise ValidationError({'week': 'Expected a date as YYYY-MM-DD.'})
+            generation = weekGeneration(day)
+        request._api_generation = generation
+    return request._api_generation
+
+
+def apiETag(request, *args, **kwargs):
+    '''
+    :return (string): The ETag of an Api response, the same for every user. None
+        for invalid requests, the view answers those with a 400.
+    '''
+    try:
+        return generationETag(apiGeneration(request), 'api')
+    except ValidationError:
+        return None
+
+
+def apiLastModified(request, *args, **kwargs):
+    try:
+        generation = apiGeneration(request)
+    except ValidationError:
+        return None
+    return generation.modified if generation is not None else None
+
+
+cacheApiReleases = conditionalReleases(apiETag, apiLastModified)
+
+
+class ReleasesPagination(CursorPagination):
+    '''
+    Pages through a list in the view's fixed ordering, so pages stay
+        consistent while streamed posts are added to the shown generation
+    '''
+
+    def get_page_size(self, request):
+        return settings.API_PAGE_SIZE
+
+    def get_ordering(self, request, queryset, view):
+        return view.ordering
+
+
+class GenerationListView(generics.ListAPIView):
+    '''
+    Lists the rows of the requested generation, reading only the serialized
+        columns
+    '''
+    pagination_class = ReleasesPagination
+    renderer_classes = (JSONRenderer,)
+
+    def get_queryset(self):
+        generation = apiGeneration(self.request)
+        model = self.serializer_class.Meta.model
+        if generation is None:
+            return model.objects.none()
+        return model.objects.filter(generation=generation).only(*modelFields(self.serializer_class))
+
+
+@method_decorator(cacheApiReleases, name='dispatch')
+class AlbumList(GenerationListView):
+    '''
+    The releases of the week, newest first. ?album_type=album or single only
+        lists those.
+    '''
+    serializer_class = SpotifyAlbumSerializer
+    ordering = ('-release', '-pk')
+
+    def get_queryset(self):
+        queryset = super(AlbumList, self).get_queryset()
+        album_type = self.request.query_params.get('album_type')
+        if album_type:
+            queryset = queryset.filter(album_type=album_type)
+        return queryset
+
+
+@method_decorator(cacheApiReleases, name='dispatch')
+class PostList(GenerationListView):
+    '''
+    The FRESH posts of the week, newest first
+    '''
+    serializer_class = RedditPostSerializer
+    ordering = ('-timestamp', '-pk')
+
+
+albumList = AlbumList.as_view()
+postList = PostList.as_view()
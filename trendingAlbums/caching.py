@@ -0,0 +1,132 @@
+'''
+HTTP caching of the weekly releases. The releases only change when a new
+generation is shown, so browsers and edge caches can keep them until the
+next Thursday cutoff and revalidate them with the generation's ETag.
+'''
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.utils import timezone
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition
+
+from .models import currentGeneration, getRefreshState
+
+
+def requestGeneration(request):
+    '''
+    :return (refreshGeneration): The generation shown for this request, only
+        looked up once per request
+    '''
+    if not hasattr(request, '_releases_generation'):
+        request._releases_generation = currentGeneration()
+    return request._releases_generation
+
+
+def releasesETag(request, *args, **kwargs):
+    '''
+    :return (string): A strong ETag of the releases page as the requesting
+        user sees it, None if the page has to be rendered anyway
+    '''
+    # Pending messages are shown once on the next rendered page, a 304
+    # would swallow them
+    if hasPendingMessages(request):
+        return None
+
+    # The navigation bar differs per user
+    user = request.user.pk if request.user.is_authenticated else 'anonymous'
+    return generationETag(requestGeneration(request), user)
+
+
+def hasPendingMessages(request):
+    '''
+    :return (bool): Whether the next rendered page shows a flash message to the
+        requesting session, which makes it neither conditional nor cacheable
+    '''
+    return len(get_messages(request)) > 0
+
+
+def generationETag(generation, *variant):
+    '''
+    :param generation (refreshGeneration): The generation a response shows
+    :param variant: Whatever else the response depends on
+    :return (string): A strong ETag that changes with the generation's version
+    '''
+    version = generation.version if generation is not None else 'none'
+    return hashlib.sha1(':'.join(str(part) for part in (version,) + variant).encode('utf-8')).hexdigest()
+
+
+def releasesLastModified(request, *args, **kwargs):
+    '''
+    :return (datetime): When the shown generation last changed, None if the
+        page has to be rendered anyway
+    '''
+    if hasPendingMessages(request):
+        return None
+
+    generation = requestGeneration(request)
+    return generation.modified if generation is not None else None
+
+
+def releasesMaxAge():
+    '''
+    :return (int): Seconds until the shown releases may change. Once the
+        cutoff has passed the new generation can go live at any moment, so
+        it is only cached for as long as the refresh worker polls.
+    '''
+    if settings.REDDIT_STREAM_ENABLED:
+        # Streamed posts are added to the shown releases as they come in
+        return settings.REDDIT_STREAM_MAX_AGE
+
+    next_refresh = getRefreshState()['next_refresh']
+    if next_refresh is None:
+        return settings.REFRESH_POLL_INTERVAL
+
+    remaining = (next_refresh - timezone.now()).total_seconds()
+    return max(int(remaining), settings.REFRESH_POLL_INTERVAL)
+
+
+def patchReleasesCacheControl(request, response):
+    '''
+    Lets edge caches hold the page for anonymous users until the next cutoff.
+        Pages of logged in users stay private and are revalidated every time,
+        pages showing a flash message are not stored at all.
+    '''
+    if hasPendingMessages(request):
+        patch_cache_control(response, private=True, no_cache=True)
+    elif request.user.is_authenticated:
+        patch_cache_control(response, private=True, max_age=0, must_revalidate=True)
+    else:
+        max_age = releasesMaxAge()
+        patch_cache_control(response, public=True, max_age=max_age, s_maxage=max_age)
+        # The session cookie decides whether a message is shown
+        patch_vary_headers(response, ['Cookie'])
+
+
+def conditionalReleases(etag_func, last_modified_func):
+    '''
+    :param etag_func (function): Computes the ETag of a request, see releasesETag
+    :param last_modified_func (function): Computes when the response of a
+        request last changed, see releasesLastModified
+    :return (function): Decorator answering conditional GETs of a releases
+        view with a 304 without running it, and setting the Cache-Control of
+        its responses
+    '''
+    def decorator(view_func):
+        conditional_view = condition(etag_func=etag_func, last_modified_func=last_modified_func)(view_func)
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            if request.method in ('GET', 'HEAD') and response.status_code in (200, 304):
+                patchReleasesCacheControl(request, response)
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+cacheReleases = conditionalReleases(releasesETag, releasesLastModified)
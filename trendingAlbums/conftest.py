@@ -0,0 +1,11 @@
+import pytest
+from django.core.cache import cache
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    # Locks, lookups and rendered pages live in the locmem cache, which
+    # would otherwise leak from one test into the next
+    cache.clear()
+    yield
+    cache.clear()
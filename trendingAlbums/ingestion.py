@@ -0,0 +1,90 @@
+'''
+Background ingestion of the weekly releases.
+
+The weekly refresh talks to both the Reddit and the Spotify Api, so it runs
+in a worker process (``python manage.py refreshalbums --loop``) instead of in
+the request of whoever visits the site first after the Thursday cutoff.
+'''
+import logging
+import time
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from . import lookups
+from .locks import cacheLock
+from .metrics import metrics, publishMetrics
+from .models import pruneGenerations, readyToUpdate
+from .releases import getSpotifyAlbums
+
+logger = logging.getLogger(__name__)
+
+REFRESH_LOCK_KEY = 'trendingAlbums:refresh-lock'
+
+
+def refreshAlbums():
+    '''
+    Runs the weekly refresh if the newest releases are out. Only one process
+        at a time gets to refresh, the others keep serving the releases that
+        are already in the database.
+
+    :return (bool): True if a refresh was run
+    '''
+    if not readyToUpdate():
+        return False
+
+    with cacheLock(REFRESH_LOCK_KEY, settings.REFRESH_LOCK_TIMEOUT) as lock:
+        if not lock:
+            logger.info('The weekly releases are already being refreshed')
+            return False
+
+        # Another process may have finished the refresh since the first check
+        if not readyToUpdate():
+            return False
+
+        logger.info('Refreshing the weekly releases')
+        lookups.stats.reset()
+        metrics.reset()
+        with metrics.stage('refresh'):
+            # The lock is extended as the refresh goes, a refresh that lost it
+            # stops with LockLost before it writes into a generation another
+            # process is building
+            generation = getSpotifyAlbums(heartbeat=lock.extend)
+        logger.info('Finished refreshing the weekly releases (%s), Spotify lookup cache: %s',
+                    generation, lookups.stats.snapshot())
+
+        # The old generations are no longer shown, so deleting them can wait
+        # until the new one is live
+        with metrics.stage('prune'):
+            logger.info('Pruned %d rows of old generations', pruneGenerations())
+
+        for kind, outcomes in lookups.stats.snapshot().items():
+            for outcome, value in outcomes.items():
+                metrics.count('lookup_cache', value, kind=kind, outcome=outcome)
+        publishMetrics(metrics.snapshot(), logger)
+        return True
+
+
+def runScheduler(interval=None):
+    '''
+    Keeps checking whether the weekly releases are ready and refreshes them
+        when they are. A failed refresh is logged and retried on the next
+        check instead of stopping the worker.
+
+    :param interval (int): Seconds to sleep between two checks, defaults to
+        the REFRESH_POLL_INTERVAL setting
+    '''
+    if interval is None:
+        interval = settings.REFRESH_POLL_INTERVAL
+
+    while True:
+        # The worker lives much longer than CONN_MAX_AGE, so drop stale
+        # connections like Django does at the start of every request
+        close_old_connections()
+        try:
+            refreshAlbums()
+        except Exception:
+            logger.exception('Refreshing the weekly releases failed')
+        finally:
+            close_old_connections()
+        time.sleep(interval)
@@ -0,0 +1,76 @@
+'''
+Locks that are shared by every process using the same cache, which is the
+Redis cache in production.
+'''
+import contextlib
+import uuid
+
+from django.core.cache import cache
+
+
+class LockLost(Exception):
+    '''
+    The lock expired and is no longer ours, whatever it guarded may now be
+        done by another process at the same time
+    '''
+
+
+class HeldLock(object):
+    '''
+    What cacheLock() yields. It is true if the lock was acquired, and a
+        holder that runs for longer than the timeout has to extend() it.
+    '''
+
+    def __init__(self, key, token, timeout, acquired):
+        self.key = key
+        self.token = token
+        self.timeout = timeout
+        self.acquired = acquired
+
+    def __bool__(self):
+        return self.acquired
+
+    def held(self):
+        '''
+        :return (bool): Whether the lock is still ours
+        '''
+        return self.acquired and cache.get(self.key) == self.token
+
+    def extend(self):
+        '''
+        Restarts the timeout of the lock, call it well within the timeout. The
+            token is checked before it is stored again, which is only safe
+            because the lock can not expire in between when it is extended in
+            time.
+
+        :raise LockLost: If the lock expired, it may have been taken by
+            another process since
+        '''
+        if not self.held():
+            raise LockLost('The lock {0} expired'.format(self.key))
+        cache.set(self.key, self.token, self.timeout)
+
+
+@contextlib.contextmanager
+def cacheLock(key, timeout):
+    '''
+    Tries to take the lock stored under key without waiting for it. The lock
+        expires after timeout seconds so a crashed holder can not keep it
+        forever, holders that take longer extend it as they go.
+
+    :param key (string): Cache key of the lock
+    :param timeout (int): Seconds after which the lock is released anyway,
+        unless it is extended
+    :return (HeldLock): Yields the lock, which is true if it was acquired
+    '''
+    token = uuid.uuid4().hex
+    # add() only stores the value if the key is missing, which is atomic
+    # on the Redis backend
+    lock = HeldLock(key, token, timeout, bool(cache.add(key, token, timeout)))
+    try:
+        yield lock
+    finally:
+        # Only release our own lock, it may have expired and been taken
+        # by another process in the meantime
+        if lock.held():
+            cache.delete(key)
@@ -0,0 +1,167 @@
+'''
+Cached Spotify lookups for the weekly refresh. The same artists trend week
+after week, so their searches are answered from the cache (Redis in
+production) instead of the Spotify Api whenever possible.
+'''
+import hashlib
+import re
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .metrics import metrics
+from .spotify import resolveConcurrently
+
+
+class LookupStats(object):
+    '''
+    Thread-safe hit and miss counters of the lookup cache, per kind of lookup
+    '''
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = Counter()
+
+    def record(self, kind, hit):
+        with self._lock:
+            self._counts[(kind, 'hits' if hit else 'misses')] += 1
+
+    def snapshot(self):
+        '''
+        :return (dict): {kind: {'hits': int, 'misses': int}} of all lookups so far
+        '''
+        with self._lock:
+            stats = {}
+            for (kind, outcome), count in self._counts.items():
+                stats.setdefault(kind, {'hits': 0, 'misses': 0})[outcome] = count
+            return stats
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+
+
+stats = LookupStats()
+
+
+def normalizeName(name):
+    '''
+    :param name (string): An artist name or album title as it appears in a post
+    :return (string): The name in lower case with collapsed whitespace, so that
+        different spellings of the same post share a cache entry
+    '''
+    return re.sub(r'\s+', ' ', name).strip().lower()
+
+
+def cacheKey(kind, *parts):
+    '''
+    :return (string): The cache key of a lookup. The parts are hashed as they
+        may contain characters or lengths that cache backends do not accept.
+    '''
+    digest = hashlib.md5('\x1f'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+    return 'trendingAlbums:spotify:{0}:{1}'.format(kind, digest)
+
+
+def cachedLookup(kind, key, timeout, fetch):
+    '''
+    :param kind (string): Name of the lookup, used for the counters
+    :param key (string): Cache key of the lookup
+    :param timeout (int): Seconds the result is cached for
+    :param fetch (function): Does the lookup against Spotify on a miss
+    :return: The cached or freshly fetched result
+    '''
+    result = cache.get(key)
+    if result is not None:
+        stats.record(kind, hit=True)
+        return result
+
+    stats.record(kind, hit=False)
+    with metrics.call('spotify', kind):
+        result = fetch()
+    cache.set(key, result, timeout)
+    return result
+
+
+def searchArtist(spotify, artist):
+    '''
+    Artist ids do not change, so these are cached for a long time.
+
+    :param spotify (Spotify): The Spotify client
+    :param artist (string): The artist name from the post
+    :return (dict): The 'artists' part of the Spotify search response
+    '''
+    return cachedLookup('artist', cacheKey('artist', normalizeName(artist)), settings.SPOTIFY_ARTIST_CACHE_TTL,
+                        lambda: spotify.search(q='artist:' + artist, type='artist')['artists'])
+
+
+def artistAlbums(spotify, artist_id, album_type):
+    '''
+    The releases of an artist change every week, so these are only cached for
+        a short time or the new release would be missed.
+
+    :param spotify (Spotify): The Spotify client
+    :param artist_id (string): The Spotify id of the artist
+    :param album_type (string): 'album' or 'single'
+    :return (list): The artist's releases, latest first
+    '''
+    return cachedLookup('artist_albums', cacheKey('artist_albums', artist_id, album_type),
+                        settings.SPOTIFY_RELEASE_CACHE_TTL,
+                        lambda: spotify.artist_albums(artist_id, album_type=album_type)['items'])
+
+
+# Most album ids Spotify's several albums endpoint accepts per request
+SEVERAL_ALBUMS_LIMIT = 20
+
+
+def compactAlbum(album):
+    '''
+    :param album (dict): A full album object of the Spotify Api
+    :return (dict): The parts of album the refresh uses, the track listing is
+        dropped so that the cache entries stay small
+    '''
+    return {'id': album['id'], 'uri': album['uri'], 'name': album['name'], 'album_type': album['album_type'],
+            'release_date': album['release_date'], 'images': album['images'],
+            'total_tracks': album['tracks']['total']}
+
+
+def fullAlbums(spotify, album_ids):
+    '''
+    Fetches the full albums of many ids at once. The ones missing from the
+        cache are requested in batches of SEVERAL_ALBUMS_LIMIT ids, the
+        batches concurrently.
+
+    :param spotify (Spotify): The Spotify client
+    :param album_ids (iterable): Spotify album ids, duplicates are fetched once
+    :return (dict): The compacted album of every id Spotify knows
+    '''
+    keys = {album_id: cacheKey('full_album', album_id) for album_id in album_ids}
+    cached = cache.get_many(list(keys.values()))
+
+    albums = {}
+    missing = []
+    for album_id, key in keys.items():
+        stats.record('full_album', hit=key in cached)
+        if key in cached:
+            albums[album_id] = cached[key]
+        else:
+            missing.append(album_id)
+
+    batches = [missing[start:start + SEVERAL_ALBUMS_LIMIT] for start in range(0, len(missing), SEVERAL_ALBUMS_LIMIT)]
+
+    def fetch(batch):
+        with metrics.call('spotify', 'full_albums'):
+            return spotify.albums(batch)['albums']
+
+    responses = resolveConcurrently(fetch, batches)
+
+    fetched = {}
+    for batch, response in zip(batches, responses):
+        # Unknown ids come back as null
+        for album_id, album in zip(batch, response):
+            if album is not None:
+                fetched[album_id] = compactAlbum(album)
+    cache.set_many({keys[album_id]: album for album_id, album in fetched.items()}, settings.SPOTIFY_ALBUM_CACHE_TTL)
+    albums.update(fetched)
+    return albums
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from trendingAlbums.ingestion import refreshAlbums, runScheduler
+
+
+class Command(BaseCommand):
+    help = 'Refreshes the weekly releases from Reddit and Spotify when they are ready'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Keep running and refresh every week instead of checking once',
+        )
+        parser.add_argument(
+            '--interval', type=int, default=None,
+            help='Seconds between two checks when looping (default: REFRESH_POLL_INTERVAL)',
+        )
+
+    def handle(self, *args, **options):
+        if options['loop']:
+            runScheduler(options['interval'])
+            return
+
+        if refreshAlbums():
+            self.stdout.write(self.style.SUCCESS('Refreshed the weekly releases'))
+        else:
+            self.stdout.write('The weekly releases are already up to date')
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from trendingAlbums.replay import replayRefresh
+
+
+class Command(BaseCommand):
+    help = 'Times the weekly refresh against recorded Reddit and Spotify responses, nothing is saved'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--record', action='store_true',
+            help='Record the responses of the live Apis into the cassettes instead of replaying them',
+        )
+        parser.add_argument(
+            '--cassettes', default=None,
+            help='Directory of the cassettes (default: REPLAY_CASSETTE_DIR)',
+        )
+        parser.add_argument(
+            '--latency', type=float, default=None,
+            help='Seconds every replayed response is delayed by (default: REPLAY_LATENCY)',
+        )
+        parser.add_argument(
+            '--runs', type=int, default=1,
+            help='Number of refreshes, the lookup cache is kept between them',
+        )
+
+    def handle(self, *args, **options):
+        runs = 1 if options['record'] else options['runs']
+        for run in range(runs):
+            timing = replayRefresh(record=options['record'], cassette_dir=options['cassettes'],
+                                   latency=options['latency'], cold=run == 0)
+            self.stdout.write('Run {0}: {1:.3f}s, {2} posts, {3} albums, lookups {4}'.format(
+                run + 1, timing.seconds, timing.posts, timing.albums, timing.lookups))
+        if options['record']:
+            self.stdout.write(self.style.SUCCESS('Recorded the cassettes'))
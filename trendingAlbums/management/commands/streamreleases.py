@@ -0,0 +1,17 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from trendingAlbums.streaming import runStream
+
+
+class Command(BaseCommand):
+    help = 'Adds new releases to the listing as soon as their FRESH post appears on Reddit'
+
+    def handle(self, *args, **options):
+        while True:
+            # runStream only returns when the connection to reddit failed
+            runStream()
+            self.stderr.write('Lost the Reddit submission stream, reconnecting')
+            time.sleep(settings.REDDIT_STREAM_PAUSE)
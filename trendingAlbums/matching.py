@@ -0,0 +1,103 @@
+'''
+Fuzzy matching of the release title of a post against an artist's releases
+on Spotify. Posts and Spotify rarely spell a release exactly the same way,
+e.g. ``SICKO MODE ft. Drake`` and ``SICKO MODE``, so both are normalized and
+scored by their similarity.
+'''
+import re
+import unicodedata
+from collections import defaultdict, namedtuple
+from difflib import SequenceMatcher
+
+# The best release of a candidate set and how similar its title is, from 0 to 1
+albumMatch = namedtuple('albumMatch', ['album', 'confidence'])
+
+# (feat. X), [ft. X], (with X)
+FEATURE_GROUP = re.compile(r'[(\[]\s*(?:feat|ft|featuring|with)\b[^)\]]*[)\]]')
+# A trailing "feat. X" without brackets
+FEATURE_TAIL = re.compile(r'\s(?:feat|ft|featuring)\b\.?\s.*$')
+# (Deluxe), [Deluxe Edition], (Remastered 2018) ...
+EDITION_GROUP = re.compile(r'[(\[][^)\]]*\b(?:deluxe|edition|remaster(?:ed)?|expanded|bonus)\b[^)\]]*[)\]]')
+# A trailing "- Deluxe Edition"
+EDITION_TAIL = re.compile(r'\s-\s[^-]*\b(?:deluxe|edition|remaster(?:ed)?|expanded|bonus)\b[^-]*$')
+NON_WORD = re.compile(r'[^\w\s]')
+WHITESPACE = re.compile(r'\s+')
+
+
+def normalizeTitle(title):
+    '''
+    :param title (string): A release title from a post or from Spotify
+    :return (string): The title in lower case without accents, featured
+        artists, edition suffixes and punctuation
+    '''
+    title = unicodedata.normalize('NFKD', title).encode('ascii', 'ignore').decode('ascii').lower()
+    for pattern in (FEATURE_GROUP, EDITION_GROUP, FEATURE_TAIL, EDITION_TAIL):
+        title = pattern.sub(' ', title)
+    title = NON_WORD.sub('', title)
+    return WHITESPACE.sub(' ', title).strip()
+
+
+def similarity(first, second):
+    '''
+    :param first (string): A normalized title
+    :param second (string): Another normalized title
+    :return (float): How similar the two titles are, 1 if they are equal
+    '''
+    if first == second:
+        return 1.0
+    return SequenceMatcher(None, first, second, autojunk=False).ratio()
+
+
+class CandidateIndex(object):
+    '''
+    The releases of an artist indexed by the words of their normalized
+        titles, so a title is only scored against the releases that share a
+        word with it.
+    '''
+
+    def __init__(self, albums):
+        '''
+        :param albums (list): Spotify album objects with a 'name'
+        '''
+        self.albums = list(albums)
+        self.titles = [normalizeTitle(album['name']) for album in self.albums]
+        self.words = defaultdict(set)
+        for position, title in enumerate(self.titles):
+            for word in title.split():
+                self.words[word].add(position)
+
+    def candidates(self, title):
+        '''
+        :param title (string): A normalized title
+        :return (list): Positions of the releases sharing a word with title,
+            all of them if none does
+        '''
+        positions = set()
+        for word in title.split():
+            positions |= self.words.get(word, set())
+        return sorted(positions) if positions else list(range(len(self.albums)))
+
+    def bestMatch(self, title):
+        '''
+        :param title (string): The release title from the post
+        :return (albumMatch): The most similar release, the earliest listed
+            one on a tie. album is None if there are no releases.
+        '''
+        title = normalizeTitle(title)
+        best = albumMatch(None, 0.0)
+        for position in self.candidates(title):
+            score = similarity(title, self.titles[position])
+            if score > best.confidence:
+                best = albumMatch(self.albums[position], score)
+                if score == 1.0:
+                    break
+        return best
+
+
+def bestMatch(title, albums):
+    '''
+    :param title (string): The release title from the post
+    :param albums (list): The artist's releases as Spotify album objects
+    :return (albumMatch): The release whose title is most similar to title
+    '''
+    return CandidateIndex(albums).bestMatch(title)
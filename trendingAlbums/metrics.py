@@ -0,0 +1,143 @@
+'''
+Instrumentation of the weekly refresh. The refresh records how long each of
+its stages took, how many calls it made to Reddit and Spotify and why posts
+were or were not matched. The numbers of the last refresh are logged as JSON
+and kept in the cache, where the metrics endpoint renders them for Prometheus.
+'''
+import json
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from django.core.cache import cache
+
+METRICS_CACHE_KEY = 'trendingAlbums:refresh-metrics'
+METRIC_PREFIX = 'weeklydrop_refresh'
+
+
+class RefreshMetrics(object):
+    '''
+    Thread-safe stage durations and labelled counters of one refresh
+    '''
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages = Counter()
+        self._counts = Counter()
+
+    @contextmanager
+    def stage(self, name):
+        '''
+        Adds the time spent in the block to the stage name
+        '''
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def observe(self, name, seconds):
+        with self._lock:
+            self._stages[name] += seconds
+
+    def count(self, name, amount=1, **labels):
+        '''
+        :param name (string): Name of the counter, e.g. 'api_calls'
+        :param amount (number): What is added to the counter
+        :param labels: Label values of the counter, e.g. service='spotify'
+        '''
+        with self._lock:
+            self._counts[(name, tuple(sorted(labels.items())))] += amount
+
+    @contextmanager
+    def call(self, service, method):
+        '''
+        Counts and times one outbound request of the block
+        '''
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.count('api_calls', service=service, method=method)
+            self.count('api_seconds', time.perf_counter() - start, service=service, method=method)
+
+    def snapshot(self):
+        '''
+        :return (dict): The 'stages' with their seconds, and the 'counts' as a
+            list of {'name', 'labels', 'value'}
+        '''
+        with self._lock:
+            return {
+                'stages': dict(self._stages),
+                'counts': [{'name': name, 'labels': dict(labels), 'value': value}
+                           for (name, labels), value in sorted(self._counts.items(), key=str)],
+            }
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+            self._counts.clear()
+
+
+metrics = RefreshMetrics()
+
+
+def publishMetrics(snapshot, logger):
+    '''
+    Logs the metrics of a finished refresh as one JSON line and keeps them
+        for the metrics endpoint until the next refresh replaces them
+
+    :param snapshot (dict): The refresh's metrics, see RefreshMetrics.snapshot()
+    :param logger (logging.Logger): Where the metrics are logged
+    '''
+    snapshot = dict(snapshot, finished=time.time())
+    logger.info('refresh_metrics %s', json.dumps(snapshot, sort_keys=True))
+    cache.set(METRICS_CACHE_KEY, snapshot, None)
+
+
+def lastMetrics():
+    '''
+    :return (dict): The metrics of the last finished refresh, None if there
+        was none since the cache was last cleared
+    '''
+    return cache.get(METRICS_CACHE_KEY)
+
+
+def escapeLabel(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def formatSample(name, labels, value):
+    '''
+    :return (string): One sample line of the Prometheus text format
+    '''
+    if labels:
+        name += '{' + ','.join('{0}="{1}"'.format(key, escapeLabel(labels[key])) for key in sorted(labels)) + '}'
+    return '{0} {1}'.format(name, repr(float(value)))
+
+
+def renderPrometheus(snapshot):
+    '''
+    :param snapshot (dict): The metrics of the last refresh, None if no refresh
+        finished yet
+    :return (string): The metrics in the Prometheus text exposition format
+    '''
+    if snapshot is None:
+        return ''
+
+    families = {}
+    stage_metric = METRIC_PREFIX + '_stage_seconds'
+    families[stage_metric] = [formatSample(stage_metric, {'stage': stage}, seconds)
+                              for stage, seconds in sorted(snapshot['stages'].items())]
+    for count in snapshot['counts']:
+        metric = '{0}_{1}'.format(METRIC_PREFIX, count['name'])
+        families.setdefault(metric, []).append(formatSample(metric, count['labels'], count['value']))
+    finished_metric = METRIC_PREFIX + '_finished_timestamp_seconds'
+    families[finished_metric] = [formatSample(finished_metric, {}, snapshot['finished'])]
+
+    lines = []
+    for metric in sorted(families):
+        lines.append('# TYPE {0} gauge'.format(metric))
+        lines.extend(families[metric])
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,76 @@
+# Generated by Django 2.0.8 on 2026-10-18 12:31
+
+import datetime as dt
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def adopt_existing_rows(apps, schema_editor):
+    '''
+    Wraps the rows of the last delete-then-rebuild refresh into a generation
+        and shows it, so the page does not go empty until the next refresh
+    '''
+    redditPost = apps.get_model('trendingAlbums', 'redditPost')
+    spotifyAlbum = apps.get_model('trendingAlbums', 'spotifyAlbum')
+    refreshGeneration = apps.get_model('trendingAlbums', 'refreshGeneration')
+    refreshState = apps.get_model('trendingAlbums', 'refreshState')
+
+    latest = spotifyAlbum.objects.order_by('-created').first()
+    if latest is None:
+        return
+
+    # The week is named after the Thursday 21:15 cutoff before the refresh, in
+    # local time, like getLastThursday(utc_to_local(...)) does for new ones
+    local = latest.created.astimezone(tz=None)
+    cutoff = local.replace(hour=21, minute=15, second=0, microsecond=0)
+    cutoff -= dt.timedelta(days=(cutoff.weekday() - 3) % 7)
+    if cutoff > local:
+        cutoff -= dt.timedelta(weeks=1)
+
+    generation = refreshGeneration.objects.create(week=cutoff.date())
+    # Keep the age of the data, readyToUpdate() compares against it
+    refreshGeneration.objects.filter(pk=generation.pk).update(created=latest.created)
+    redditPost.objects.update(generation=generation)
+    spotifyAlbum.objects.update(generation=generation)
+    refreshState.objects.create(pk=1, current=generation)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trendingAlbums', '0003_spotifyalbum_album_type'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='refreshGeneration',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('modified', models.DateTimeField(auto_now=True)),
+                ('week', models.DateField()),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='refreshState',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('current', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='trendingAlbums.refreshGeneration')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='redditpost',
+            name='generation',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='posts', to='trendingAlbums.refreshGeneration'),
+        ),
+        migrations.AddField(
+            model_name='spotifyalbum',
+            name='generation',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='albums', to='trendingAlbums.refreshGeneration'),
+        ),
+        migrations.RunPython(adopt_existing_rows, migrations.RunPython.noop),
+    ]
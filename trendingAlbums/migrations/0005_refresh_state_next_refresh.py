@@ -0,0 +1,23 @@
+# Generated by Django 2.0.8 on 2026-10-18 12:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trendingAlbums', '0004_refresh_generations'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='refreshstate',
+            name='next_refresh',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.AlterField(
+            model_name='redditpost',
+            name='timestamp',
+            field=models.DateTimeField(db_index=True),
+        ),
+    ]
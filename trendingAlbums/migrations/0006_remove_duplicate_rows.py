@@ -0,0 +1,29 @@
+# Generated by Django 2.0.8 on 2026-10-18 12:34
+
+from django.db import migrations, models
+
+
+def remove_duplicates(apps, schema_editor):
+    '''
+    Keeps the first row of every post_id and uri within a generation, so the
+        unique constraints can be added
+    '''
+    for model_name, field in (('redditPost', 'post_id'), ('spotifyAlbum', 'uri')):
+        model = apps.get_model('trendingAlbums', model_name)
+        duplicates = (model.objects.values('generation', field)
+                      .annotate(first=models.Min('id'), count=models.Count('id'))
+                      .filter(count__gt=1))
+        for duplicate in duplicates:
+            (model.objects.filter(generation=duplicate['generation'], **{field: duplicate[field]})
+             .exclude(id=duplicate['first']).delete())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trendingAlbums', '0005_refresh_state_next_refresh'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 2.0.8 on 2026-10-18 12:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trendingAlbums', '0006_remove_duplicate_rows'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='redditpost',
+            name='post_id',
+            field=models.CharField(db_index=True, max_length=200),
+        ),
+        migrations.AlterField(
+            model_name='spotifyalbum',
+            name='uri',
+            field=models.CharField(db_index=True, max_length=200),
+        ),
+        migrations.AlterUniqueTogether(
+            name='redditpost',
+            unique_together={('generation', 'post_id')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='spotifyalbum',
+            unique_together={('generation', 'uri')},
+        ),
+        migrations.AddIndex(
+            model_name='spotifyalbum',
+            index=models.Index(fields=['generation', 'album_type', 'release'], name='album_listing_idx'),
+        ),
+    ]
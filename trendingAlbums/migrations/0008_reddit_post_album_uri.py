@@ -0,0 +1,18 @@
+# Generated by Django 2.0.8 on 2026-10-18 12:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trendingAlbums', '0007_listing_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='redditpost',
+            name='album_uri',
+            field=models.CharField(blank=True, default='', max_length=200),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 2.0.8 on 2026-10-18 12:38
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trendingAlbums', '0008_reddit_post_album_uri'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='crawlCheckpoint',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('modified', models.DateTimeField(auto_now=True)),
+                ('listing', models.CharField(max_length=20)),
+                ('after', models.CharField(blank=True, default='', max_length=20)),
+                ('done', models.BooleanField(default=False)),
+                ('generation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='checkpoints', to='trendingAlbums.refreshGeneration')),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='crawlcheckpoint',
+            unique_together={('generation', 'listing')},
+        ),
+    ]
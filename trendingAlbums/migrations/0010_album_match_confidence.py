@@ -0,0 +1,18 @@
+# Generated by Django 2.0.8 on 2026-10-18 12:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trendingAlbums', '0009_crawl_checkpoints'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='spotifyalbum',
+            name='confidence',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
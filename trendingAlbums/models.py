@@ -1,16 +1,13 @@
 # Create your models here.
-import praw
-import spotipy
+import logging
 import datetime as dt
-import pandas as pd
 
-from spotipy.oauth2 import SpotifyClientCredentials
-
-from django.db import models
+from django.conf import settings
+from django.core.cache import cache
+from django.db import models, transaction
 from django.utils import timezone
 
-from config.settings.base import get_secret
-
+logger = logging.getLogger(__name__)
 
 
 
@@ -26,121 +23,226 @@ class TimeStampedModel(models.Model):
         abstract = True
 
 
+class refreshGeneration(TimeStampedModel):
+    """
+    One weekly refresh of the releases. Every refresh writes its redditPosts
+    and spotifyAlbums into a new generation, readers only ever see the
+    generation refreshState currently points at.
+    """
+    week = models.DateField()
+
+    def __str__(self):
+        return 'Week of {0}'.format(self.week)
+
+    @property
+    def version(self):
+        """
+        Changes whenever the generation is replaced or modified, cached
+        renderings of the releases are keyed on it.
+        """
+        return '{0}.{1}'.format(self.pk, int(self.modified.timestamp() * 1000000))
+
+
+class refreshState(models.Model):
+    """
+    Single row holding the pointer to the generation that is shown. Flipping
+    the pointer is one UPDATE, so readers see either the old or the new
+    generation but never a half built one. It also stores when the next
+    refresh is due, so checking for it does not need to look at the posts.
+    """
+    current = models.ForeignKey(refreshGeneration, null=True, on_delete=models.SET_NULL, related_name='+')
+    next_refresh = models.DateTimeField(null=True)
+
+
 class redditPost(TimeStampedModel):
     """
     Basic Model for a Reddit Post
     """
+    generation = models.ForeignKey(refreshGeneration, null=True, on_delete=models.CASCADE, related_name='posts')
     title = models.CharField(max_length=200)
     score = models.IntegerField()
-    post_id = models.CharField(max_length=200)
+    post_id = models.CharField(max_length=200, db_index=True)
     url = models.CharField(max_length=200)
     comms_numm = models.IntegerField()
-    timestamp = models.DateTimeField()
+    timestamp = models.DateTimeField(db_index=True)
+    # uri of the spotifyAlbum the post was matched to, empty if there was no match
+    album_uri = models.CharField(max_length=200, blank=True, default='')
+
+    class Meta:
+        unique_together = ('generation', 'post_id')
+
+class crawlCheckpoint(TimeStampedModel):
+    """
+    How far one Reddit listing was crawled for a generation that is being
+    built, so a restarted refresh continues after the last saved page instead
+    of fetching the listing again.
+    """
+    generation = models.ForeignKey(refreshGeneration, on_delete=models.CASCADE, related_name='checkpoints')
+    listing = models.CharField(max_length=20)
+    # fullname (t3_...) of the last submission of the last saved page
+    after = models.CharField(max_length=20, blank=True, default='')
+    done = models.BooleanField(default=False)
+
+    class Meta:
+        unique_together = ('generation', 'listing')
 
 class spotifyAlbum(TimeStampedModel):
     '''
     Basic Model for a Spotify Album
     '''
+    generation = models.ForeignKey(refreshGeneration, null=True, on_delete=models.CASCADE, related_name='albums')
     artist = models.CharField(max_length=200)
     name = models.CharField(max_length=200)
     release = models.DateTimeField()
     url = models.CharField(max_length=200)
-    uri = models.CharField(max_length=200)
+    uri = models.CharField(max_length=200, db_index=True)
     image_url = models.CharField(max_length=200)
     album_type = models.CharField(max_length=200)
+    # How similar the release title is to the one in the post, from 0 to 1.
+    # Empty for the releases matched before titles were compared.
+    confidence = models.FloatField(null=True, blank=True)
 
+    class Meta:
+        unique_together = ('generation', 'uri')
+        indexes = [
+            # The homepage lists the albums and singles of one generation by release
+            models.Index(fields=['generation', 'album_type', 'release'], name='album_listing_idx'),
+        ]
 
 
 
-### Functions relating to redditPost
 
-def getRedditObjects():
-    '''
-    This function checks whether the database is ready to update with new
-        reddit recommendations and then clears the prexisting data and fills
-        it with data retrieved about trending albums from reddit
+### Functions relating to refreshGeneration
 
-    :return: Queryset of redditPost objects just created
-    '''
-    if readyToUpdate():
-        clearDB()
-        topics_data = filterFreshOnly(getRedditPosts())
+REFRESH_STATE_ID = 1
+REFRESH_STATE_CACHE_KEY = 'trendingAlbums:refresh-state'
 
-        for index, row in topics_data.iterrows():
-            redditPost(title=row['title'], score=row['score'], post_id=row['id'], url=row['url'],
-                       comms_numm=row['comms_num'], timestamp=row['timestamp']).save()
+def getRefreshState():
+    '''
+    The refresh state is read on every request, so it is kept in the cache and
+        only loaded from the database when the cache does not have it.
 
-    return redditPost.objects.all()
+    :return (dict): The shown 'generation' and when the 'next_refresh' is due,
+        both None before the first refresh finished
+    '''
+    state = cache.get(REFRESH_STATE_CACHE_KEY)
+    if state is None:
+        state = loadRefreshState()
+    return state
 
-def clearDB():
+def loadRefreshState():
     '''
-    This function clears the database of redditPost objects if any are there
+    Reads the refresh state from the database and caches it. The cache entry
+        is replaced whenever a generation is published, the timeout only bounds
+        how stale it gets with a cache that is not shared between processes.
+
+    :return (dict): The refresh state, see getRefreshState()
     '''
-    if redditPost.objects.count() == 0:
-        return
-    else:
-        redditPost.objects.all().delete()
+    row = refreshState.objects.select_related('current').filter(pk=REFRESH_STATE_ID).first()
+    generation = row.current if row is not None else None
+    next_refresh = row.next_refresh if row is not None else None
+    if next_refresh is None and generation is not None:
+        next_refresh = refreshDueAt(generation)
 
-def filterFreshOnly(topics_data):
+    state = {'generation': generation, 'next_refresh': next_refresh}
+    cache.set(REFRESH_STATE_CACHE_KEY, state, settings.REFRESH_STATE_CACHE_TIMEOUT)
+    return state
+
+def forgetRefreshState():
     '''
-    :param topics_data (pd.Dataframe): The dataframe containg info about the hottest
-        posts from the hiphopheads subreddit
-    :return: A mask of topic_data which will only contain posts about new releases
+    Drops the cached refresh state now and again once the surrounding
+        transaction commits, so nobody keeps the state from before it
     '''
-    mask = [checkFresh(x) for x in topics_data.title]
-    return topics_data[mask]
+    cache.delete(REFRESH_STATE_CACHE_KEY)
+    transaction.on_commit(lambda: cache.delete(REFRESH_STATE_CACHE_KEY))
 
-def checkFresh(title):
+def currentGeneration():
     '''
-    The title of reddit posts that infer a new album is released has
-        a certain tags in the post's title. This function checks if the
-        post identifies a new release through the title
-    :param title (string): title of the reddit post
-    :return: (bool): check if the reddit post is about a new release
+    :return (refreshGeneration): The generation that is shown, None before the
+        first refresh finished
     '''
-    return checkFreshSingle(title) or checkFreshEP(title) or checkFreshAlbum(title)
+    return getRefreshState()['generation']
 
-def checkFreshSingle(title):
+def weekGeneration(day):
     '''
-    :param title (string): title of the reddit post
-    :return(bool): check if the reddit post is about a new single release
+    :param day (date): Any day of the week asked for
+    :return (refreshGeneration): The generation that is or was shown for the
+        week day falls in, None if it is not kept or not refreshed yet
     '''
-    return title[:7] == "[FRESH]"
+    current = currentGeneration()
+    if current is None:
+        return None
+
+    week = day - dt.timedelta(days=(day.weekday() - 3) % 7)
+    if week == current.week:
+        return current
+    if week > current.week:
+        return None
+    # Generations of past weeks are only pruned, never changed, their newest
+    # one is the one that was shown last
+    return refreshGeneration.objects.filter(week=week, created__lt=current.created).order_by('-created').first()
 
-def checkFreshEP(title):
+def currentAlbums():
     '''
-    :param title (string): title of the reddit post
-    :return(bool): check if the reddit post is about a new EP release
+    :return (QuerySet): The spotifyAlbums of the generation that is shown
     '''
-    return title[:10] == "[FRESH EP]"
+    generation = currentGeneration()
+    if generation is None:
+        return spotifyAlbum.objects.none()
+    return spotifyAlbum.objects.filter(generation=generation)
 
-def checkFreshAlbum(title):
+def groupReleases(albums):
     '''
-    :param title (string): title of the reddit post
-    :return(bool): check if the reddit post is about a new Album release
+    :param albums (QuerySet): spotifyAlbums of one generation
+    :return (dict): The albums and the singles, newest release first, fetched
+        in one query
     '''
-    return title[:13] == "[FRESH ALBUM]"
+    grouped = {'album': [], 'single': []}
+    for album in albums.filter(album_type__in=list(grouped)).order_by('album_type', '-release'):
+        grouped[album.album_type].append(album)
+    return grouped
 
-def get_date(created):
+def publishGeneration(generation):
     '''
-    :param created (string): A string representing the date when reddit post was created
-    :return (datetime): The corresponding datetime format for date
+    Atomically makes generation the one that is shown and computes once when
+        the next refresh is due
+
+    :param generation (refreshGeneration): A fully built generation
     '''
-    return dt.datetime.fromtimestamp(created)
+    refreshState.objects.update_or_create(pk=REFRESH_STATE_ID, defaults={
+        'current': generation, 'next_refresh': refreshDueAt(generation)})
+    forgetRefreshState()
 
-def fixDates(topics_data):
+def pruneGenerations():
     '''
-    This function gets the created column from topics_data and creates a timestamp
-        column that provides the post's date created in a human readable format.
-    :param topics_data (pd.Dataframe): The dataframe containg info about the hottest
-        posts from the hiphopheads subreddit
-    :return: A copy of topics data containg the new timestamp column
+    Deletes the generations, with their posts and albums, whose week lies more
+        than REFRESH_HISTORY_WEEKS weeks before the shown one, as well as the
+        ones of the shown week that it replaced. Generations newer than the shown
+        one may still be being built and are left alone.
+
+    :return (int): The number of deleted rows
     '''
-    timestamp = topics_data["created"].apply(get_date)
-    topics_data = topics_data.assign(timestamp=timestamp)
-    return topics_data
+    generation = currentGeneration()
+    if generation is None:
+        return 0
 
+    oldest_week = generation.week - dt.timedelta(weeks=settings.REFRESH_HISTORY_WEEKS)
+    stale = refreshGeneration.objects.exclude(pk=generation.pk).filter(
+        models.Q(week__lt=oldest_week) | models.Q(created__lt=generation.created, week=generation.week))
+    deleted, _ = stale.delete()
+    return deleted
 
+def getLastThursday(current_date):
+    '''
+    :param current_date (datetime): A local datetime
+    :return (datetime): The latest Thursday 21:15 release cutoff at or before
+        current_date, it names the week a generation belongs to
+    '''
+    latest_date = current_date.replace(hour=21, minute=15, second=0, microsecond=0)
+    latest_date -= dt.timedelta(days=(latest_date.weekday() - 3) % 7)
+    if latest_date > current_date:
+        latest_date -= dt.timedelta(weeks=1)
+    return latest_date
 
 def utc_to_local(utc_dt):
     '''
@@ -151,177 +253,35 @@ def utc_to_local(utc_dt):
 def readyToUpdate():
     '''
     This function checks whether it is ready to update due to new releases.
-        It checks the current redditPosts and checks the date the lates one was
-        created at. Then a new datetime nexThursday is created which corresponds
-        to the next coming Thursday after the redditPost was created. If the
-        current time is later than nextThiursday that means the newest releases
-        are out.
-    '''
-    if redditPost.objects.count() == 0:
+        When a generation is published the next coming Thursday after it was
+        built is stored as nextThursday. If the current time is later than
+        nextThursday that means the newest releases are out. nextThursday
+        comes from the cached refresh state, so this does not query the
+        database.
+    '''
+    nextThursday = getRefreshState()['next_refresh']
+    if nextThursday is None:
         return True
 
-    numPastPosts = redditPost.objects.count()
+    return timezone.now() > nextThursday
 
-    latestPost = redditPost.objects.order_by('timestamp')[numPastPosts - 1]
 
-    latestDateTime = utc_to_local(getattr(latestPost, 'timestamp'))
-
-    nextThursday = getNextThursday(latestDateTime)
-
-    currentDateTime = utc_to_local(timezone.now())
+def refreshDueAt(generation):
+    '''
+    :param generation (refreshGeneration): The shown generation
+    :return (datetime): The Thursday cutoff after which generation is out of date
+    '''
+    latestDateTime = utc_to_local(getattr(generation, 'created'))
 
-    return currentDateTime > nextThursday
+    return getNextThursday(latestDateTime)
 
 
 def getNextThursday(latest_date):
     '''
     :param latest_date: The datetime corresponding to the date the latest
         redditPost was created on
-    :return (datetime): The datetime object corresponding to the next
-        Thursday afte latest_date
+    :return (datetime): The datetime object corresponding to the first
+        Thursday cutoff after latest_date, the same day if latest_date is a
+        Thursday before 21:15
     '''
-
-    #If we are on the Thursday after the last Update
-    if latest_date.weekday() == 3:
-        latest_date += dt.timedelta(days=1)
-
-    while latest_date.weekday() != 3:
-        latest_date += dt.timedelta(days=1)
-
-    latest_date = latest_date.replace(hour=21, minute=15, second=0, microsecond=0)
-
-    return latest_date
-
-
-
-def getRedditPosts():
-   '''
-    This function uses a praw reddit wrapper in order to use the Reddit Api. The wrapper
-        created checks the hiphopheads subreddit and gets the hittest 50 posts. Each reddit post's
-        characteristics that are transferrable to redditPost are put in a dictionary. The dictionary
-        then gets converted to a pandas Dataframe object
-   :return (pd.DataFrame): A dataframe containg info about the reddit posts from r/hiphopheads
-   '''
-   reddit = praw.Reddit(client_id=get_secret("REDDIT_CLIENT_ID"), client_secret= get_secret("REDDIT_SECRET_KEY"),
-                             redirect_uri=get_secret("REDIRECT_URI"), user_agent=get_secret("REDDIT_USER_AGENT"))
-
-   subreddit = reddit.subreddit('hiphopheads')
-
-   topics_dict = {"title": [], "score": [], "id": [], "url": [], "comms_num": [], "created": []}
-
-   hot_subreddit = subreddit.hot(limit=50)
-
-   for submission in hot_subreddit:
-       topics_dict["title"].append(submission.title)
-       topics_dict["score"].append(submission.score)
-       topics_dict["id"].append(submission.id)
-       topics_dict["url"].append(submission.url)
-       topics_dict["comms_num"].append(submission.num_comments)
-       topics_dict["created"].append(submission.created)
-
-
-   return fixDates(pd.DataFrame(topics_dict))
-
-
-### Functions relating to spotifyAlbum
-
-
-def getDateTime(str_time):
-    '''
-    :param str_time (string): A date represented in yyyy-mm-dd format
-    :return (datetime): The corresponding datetime object for str_time
-    '''
-    return pd.to_datetime(str_time).date()
-
-
-def getSpotifyAlbums():
-    '''
-    This function retrieves the newest Spotify releases based on what is
-        trending on the hiphopheads subreddit. The redditPosts are retrieved
-        and the current SpotifyAlbums are deleted from the database. Then for
-        every redditPost object it is converted to a spotifyAlbum object.
-    '''
-    trending = getRedditObjects()
-    spotifyAlbum.objects.all().delete()
-
-    for album in trending:
-        convertRedditSpotify(album)
-
-
-def convertRedditSpotify(album):
-    '''
-    This function uses the Spotify Web Api through the spotipy python wrapper. A spotify
-        client is initilized and we extract the artist and album names from the post's
-        title. The client is then used to search for the artist and retrieves the latest
-        release. It then checks if it is the same release the redditPost corresponds to
-        and if so a corresponding spotifyAlbum is initialized in the database
-
-    :param album (redditPost): The redditPost corresponding to an artist's new release
-    :return:
-    '''
-    client_credentials_manager = SpotifyClientCredentials(client_id=get_secret("SPOTIFY_CLIENT_ID"),
-                                                          client_secret=get_secret("SPOTIFY_CLIENT_SECRET"))
-    spotify = spotipy.Spotify(client_credentials_manager=client_credentials_manager)
-
-
-    name = getattr(album, 'title')
-
-    if checkFreshSingle(name):
-        seperate = name[8:].split(' - ')
-        type = 'single'
-
-    elif checkFreshEP(name):
-        seperate = name[11:].split(' - ')
-        type= 'single'
-    elif checkFreshAlbum(name):
-        seperate = name[14:].split(' - ')
-        type = 'album'
-
-    if len(seperate) != 2:
-        return
-    [artist, title] = seperate
-
-
-    artist_spotify = spotify.search(q='artist:' + artist, type='artist')['artists']
-
-    if artist_spotify['total'] == 0:
-        # The artist search was a failure
-        return
-
-    id = artist_spotify['items'][0]['id']
-
-    artist_albums = spotify.artist_albums(id, album_type=type)['items']
-
-    #Check if the artist has any albums at all
-    if artist_albums == []:
-        return
-
-    latest_album = artist_albums[0]
-
-    if checkCorrectAlbum(latest_album, title.strip(), spotify):
-        url = "https://open.spotify.com/embed/album/" + latest_album['uri'].split(':')[-1]
-        spotifyAlbum(artist=artist, name=latest_album['name'], release=getDateTime(latest_album['release_date']),
-                     url=url, uri=latest_album['uri'],
-                     image_url=latest_album['images'][1]['url'], album_type=latest_album['album_type']).save()
-
-
-def checkCorrectAlbum(album, title, spotifyclient):
-    '''
-    This function is a basic way to check if an album from the redditPost
-        object is actually on Spotify. Looking for a better process to
-        implement this check.
-
-    For now we take the lates album from the artist that was found in
-        convertRedditSpotify() and the album title from the redditPost. They
-        don;t have to the exact same titles to be reffering to the same album
-        We just search for the album using the redditPost title and see if
-        nothing pops up. We then check if the title retrieved from spotify
-        was released on the certain weekday when they should be released.
-
-    '''
-    album_spotify = spotifyclient.search(q='album:' + title, type='album')['albums']
-
-    if album_spotify['total'] == 0:
-        return False
-
-    return getDateTime(album['release_date']).weekday() == 4
+    return getLastThursday(latest_date) + dt.timedelta(weeks=1)
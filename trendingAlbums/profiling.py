@@ -0,0 +1,163 @@
+'''
+Opt-in request profiling for staging. Every PROFILING_SAMPLE_RATE-th request
+to one of the PROFILING_VIEWS, and every one sending the PROFILING_HEADER, is
+profiled: its SQL queries, view and template render time are logged and sent
+back in a Server-Timing header, and slow ones leave a cProfile dump behind.
+'''
+import cProfile
+import itertools
+import json
+import logging
+import os
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.urls import Resolver404, resolve
+
+logger = logging.getLogger(__name__)
+
+
+class QueryRecorder(object):
+    '''
+    Database execute wrapper counting the queries and the time spent in them
+    '''
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - start
+
+
+class RequestProfile(object):
+    '''
+    The measurements of one profiled request
+    '''
+
+    def __init__(self, view_name):
+        self.view_name = view_name
+        self.queries = QueryRecorder()
+        self.profiler = cProfile.Profile()
+        self.start = time.perf_counter()
+        self.view_start = None
+        self.render_start = None
+        self.render_end = None
+
+    def timings(self, end):
+        '''
+        :param end (float): perf_counter() value when the response was done
+        :return (dict): Milliseconds spent in the whole request, the view, the
+            template rendering and the database, and the number of queries
+        '''
+        view_end = self.render_start if self.render_start is not None else end
+        view_start = self.view_start if self.view_start is not None else self.start
+        render = (self.render_end - self.render_start) if self.render_end is not None else 0.0
+        return {
+            'view_name': self.view_name,
+            'total_ms': round((end - self.start) * 1000, 3),
+            'view_ms': round((view_end - view_start) * 1000, 3),
+            'render_ms': round(render * 1000, 3),
+            'db_ms': round(self.queries.seconds * 1000, 3),
+            'queries': self.queries.count,
+        }
+
+
+def profiledView(path):
+    '''
+    :param path (string): The path_info of a request
+    :return (string): The name of the view serving path if it is one of the
+        PROFILING_VIEWS, None otherwise
+    '''
+    try:
+        match = resolve(path)
+    except Resolver404:
+        return None
+
+    for view in settings.PROFILING_VIEWS:
+        if view == match.view_name or (view.endswith(':*') and match.namespace == view[:-2]):
+            return match.view_name
+    return None
+
+
+def serverTiming(timings):
+    '''
+    :return (string): The timings as a Server-Timing header value
+    '''
+    return 'total;dur={total_ms}, view;dur={view_ms}, render;dur={render_ms}, db;dur={db_ms};desc="{queries} queries"'\
+        .format(**timings)
+
+
+class ProfilingMiddleware(object):
+    '''
+    Profiles sampled requests, see the module docstring. It sits at the top of
+        MIDDLEWARE so the measurements include the other middleware, and takes
+        itself out of the stack unless PROFILING_ENABLED is set.
+    '''
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.requests = itertools.count(1)
+        self.header = 'HTTP_' + settings.PROFILING_HEADER.upper().replace('-', '_')
+
+    def __call__(self, request):
+        view_name = profiledView(request.path_info)
+        if view_name is None:
+            return self.get_response(request)
+
+        sampled = next(self.requests) % settings.PROFILING_SAMPLE_RATE == 0
+        if not sampled and self.header not in request.META:
+            return self.get_response(request)
+
+        profile = request._profile = RequestProfile(view_name)
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(profile.queries))
+            profile.profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profile.profiler.disable()
+
+        timings = profile.timings(time.perf_counter())
+        response['Server-Timing'] = serverTiming(timings)
+        logger.info('request_profile %s', json.dumps(dict(timings, path=request.path), sort_keys=True))
+        if timings['total_ms'] >= settings.PROFILING_SLOW_MS:
+            self.dump(profile, timings)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        profile = getattr(request, '_profile', None)
+        if profile is not None:
+            profile.view_start = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        profile = getattr(request, '_profile', None)
+        if profile is not None:
+            # The response is rendered right after the template response
+            # middleware ran, this one runs last as it is at the top
+            profile.render_start = time.perf_counter()
+            response.add_post_render_callback(lambda rendered: setattr(profile, 'render_end', time.perf_counter()))
+        return response
+
+    def dump(self, profile, timings):
+        '''
+        Stores the cProfile stats of a slow request in PROFILING_DUMP_DIR, they
+            can be read with pstats or snakeviz
+        '''
+        os.makedirs(settings.PROFILING_DUMP_DIR, exist_ok=True)
+        path = os.path.join(settings.PROFILING_DUMP_DIR, '{0}-{1}-{2}ms.prof'.format(
+            time.strftime('%Y%m%d-%H%M%S'), profile.view_name.replace(':', '-'), int(timings['total_ms'])))
+        profile.profiler.dump_stats(path)
+        logger.warning('Slow request to %s took %.0fms, profile stored in %s',
+                       profile.view_name, timings['total_ms'], path)
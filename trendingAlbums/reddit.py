@@ -0,0 +1,231 @@
+'''
+Crawling of the FRESH posts of r/hiphopheads into the redditPosts of a
+generation. Only the refresh worker and the stream listener use it, praw is
+imported when the client is built so the web workers never load it.
+'''
+import datetime as dt
+import logging
+from collections import namedtuple
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from config.secrets import get_secret
+
+from .metrics import metrics
+from .models import crawlCheckpoint, redditPost
+from .titles import parseTitle
+
+logger = logging.getLogger(__name__)
+
+
+# A reddit post as it streams in from praw, before it is saved as a redditPost
+redditRecord = namedtuple('redditRecord', ['title', 'score', 'id', 'url', 'comms_num', 'timestamp'])
+
+def getRedditObjects(generation, heartbeat=None):
+    '''
+    This function crawls the trending albums from reddit into redditPosts of
+        generation. Every page is saved as soon as it is read, so the crawl
+        only holds one page in memory and a restarted refresh keeps the pages
+        it already has. Read the saved posts back with generationPosts().
+
+    :param generation (refreshGeneration): The generation being built
+    :param heartbeat (function): Called before every page is saved, see
+        releases.getSpotifyAlbums()
+    :return (int): The number of posts this crawl added to generation
+    '''
+    saved = 0
+    for page in getRedditPages(generation):
+        with metrics.stage('filter'):
+            fresh = list(filterFreshOnly(page))
+        if heartbeat is not None:
+            heartbeat()
+        with metrics.stage('save_posts'):
+            saved += len(saveRedditPosts(generation, fresh))
+    return saved
+
+def generationPosts(generation, chunk_size):
+    '''
+    :param generation (refreshGeneration): The generation being built
+    :param chunk_size (int): Most posts held in memory at once
+    :return (generator): Lists of at most chunk_size redditPosts of generation,
+        in the order they were saved, each read with its own query
+    '''
+    last_pk = 0
+    while True:
+        chunk = list(generation.posts.filter(pk__gt=last_pk).order_by('pk')[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        last_pk = chunk[-1].pk
+
+def saveRedditPosts(generation, records):
+    '''
+    :param generation (refreshGeneration): The generation being built
+    :param records (iterable): redditRecords of one page, the ones whose post
+        is already part of generation are skipped
+    :return (list): The post ids of the saved posts
+    '''
+    posts = {}
+    for record in records:
+        posts.setdefault(record.id, redditPost(generation=generation, title=record.title, score=record.score,
+                                               post_id=record.id, url=record.url, comms_numm=record.comms_num,
+                                               timestamp=record.timestamp))
+    if not posts:
+        return []
+
+    # Listings overlap and a resumed crawl may read its last page again
+    for post_id in generation.posts.filter(post_id__in=list(posts)).values_list('post_id', flat=True):
+        del posts[post_id]
+    redditPost.objects.bulk_create(list(posts.values()), batch_size=settings.INGESTION_BATCH_SIZE)
+    return list(posts)
+
+def filterFreshOnly(records):
+    '''
+    :param records (iterable): The redditRecords of crawled posts from the
+        hiphopheads subreddit
+    :return (generator): The records which are about new releases, filtered
+        as they stream in
+    '''
+    return (record for record in records if checkFresh(record.title))
+
+def checkFresh(title):
+    '''
+    The title of reddit posts that infer a new album is released has
+        a certain tags in the post's title. This function checks if the
+        post identifies a new release through the title
+    :param title (string): title of the reddit post
+    :return: (bool): check if the reddit post is about a new release
+    '''
+    return parseTitle(title) is not None
+
+def checkFreshSingle(title):
+    '''
+    :param title (string): title of the reddit post
+    :return(bool): check if the reddit post is about a new single release
+    '''
+    return getattr(parseTitle(title), 'tag', None) == 'fresh'
+
+def checkFreshEP(title):
+    '''
+    :param title (string): title of the reddit post
+    :return(bool): check if the reddit post is about a new EP release
+    '''
+    return getattr(parseTitle(title), 'tag', None) == 'ep'
+
+def checkFreshAlbum(title):
+    '''
+    :param title (string): title of the reddit post
+    :return(bool): check if the reddit post is about a new Album release
+    '''
+    return getattr(parseTitle(title), 'tag', None) == 'album'
+
+def get_date(created):
+    '''
+    :param created (string): A string representing the date when reddit post was created
+    :return (datetime): The corresponding datetime format for date
+    '''
+    return dt.datetime.fromtimestamp(created)
+
+def toRedditRecord(submission):
+    '''
+    :param submission (praw.models.Submission): A post from the hiphopheads subreddit
+    :return (redditRecord): The post's characteristics that are transferrable to
+        redditPost, with its creation date already parsed
+    '''
+    return redditRecord(title=submission.title, score=submission.score, id=submission.id,
+                        url=submission.url, comms_num=submission.num_comments,
+                        timestamp=get_date(submission.created))
+
+
+def getSubreddit():
+    '''
+    :return (praw.models.Subreddit): The hiphopheads subreddit as built by the
+        REDDIT_CLIENT_FACTORY, buildSubreddit() unless it is replaced by a
+        recording or replaying one (see trendingAlbums.replay)
+    '''
+    return import_string(settings.REDDIT_CLIENT_FACTORY)()
+
+
+def buildSubreddit():
+    '''
+    This function uses a praw reddit wrapper in order to use the Reddit Api.
+
+    :return (praw.models.Subreddit): The hiphopheads subreddit
+    '''
+    import praw
+
+    reddit = praw.Reddit(client_id=get_secret("REDDIT_CLIENT_ID"), client_secret= get_secret("REDDIT_SECRET_KEY"),
+                         redirect_uri=get_secret("REDIRECT_URI"), user_agent=get_secret("REDDIT_USER_AGENT"))
+
+    return reddit.subreddit('hiphopheads')
+
+
+def searchTimeFilter(days):
+    '''
+    :param days (int): Length of the release window in days
+    :return (string): The smallest time filter of the reddit search that
+        covers the release window
+    '''
+    for time_filter, length in (('day', 1), ('week', 7), ('month', 31), ('year', 366)):
+        if days <= length:
+            return time_filter
+    return 'all'
+
+
+def fetchListingPage(subreddit, listing, after):
+    '''
+    :param subreddit (praw.models.Subreddit): The subreddit being crawled
+    :param listing (string): 'hot', 'new' or 'search'
+    :param after (string): Fullname of the submission the page starts after,
+        empty for the first page
+    :return (list): The submissions of one page, a single request to reddit
+    '''
+    kwargs = {'limit': settings.REDDIT_CRAWL_PAGE_SIZE, 'params': {'after': after} if after else {}}
+    with metrics.call('reddit', listing):
+        if listing == 'hot':
+            submissions = subreddit.hot(**kwargs)
+        elif listing == 'new':
+            submissions = subreddit.new(**kwargs)
+        elif listing == 'search':
+            submissions = subreddit.search(settings.REDDIT_SEARCH_QUERY, sort='new',
+                                           time_filter=searchTimeFilter(settings.REDDIT_CRAWL_WINDOW_DAYS), **kwargs)
+        else:
+            raise ValueError('Unknown reddit listing: {0}'.format(listing))
+        return list(submissions)
+
+
+def getRedditPages(generation, subreddit=None):
+    '''
+    Crawls the REDDIT_CRAWL_LISTINGS of r/hiphopheads page by page. A listing
+        is read until it runs out, a page has no post of the release window
+        (the last REDDIT_CRAWL_WINDOW_DAYS days) or REDDIT_CRAWL_MAX_PAGES
+        pages were read. Once the caller is done with a page the last seen
+        fullname is stored as a crawlCheckpoint of generation, so a crawl that
+        is restarted for the same generation continues after it.
+
+    :param generation (refreshGeneration): The generation being built
+    :param subreddit (praw.models.Subreddit): Defaults to getSubreddit()
+    :return (generator): Lists of the redditRecords of one page that were
+        posted in the release window
+    '''
+    if subreddit is None:
+        subreddit = getSubreddit()
+    since = (timezone.now() - dt.timedelta(days=settings.REDDIT_CRAWL_WINDOW_DAYS)).timestamp()
+
+    for listing in settings.REDDIT_CRAWL_LISTINGS:
+        checkpoint, _ = crawlCheckpoint.objects.get_or_create(generation=generation, listing=listing)
+        pages = 0
+        while not checkpoint.done:
+            page = fetchListingPage(subreddit, listing, checkpoint.after)
+            pages += 1
+            recent = [submission for submission in page if submission.created_utc >= since]
+            yield [toRedditRecord(submission) for submission in recent]
+
+            if page:
+                checkpoint.after = page[-1].fullname
+            checkpoint.done = (len(page) < settings.REDDIT_CRAWL_PAGE_SIZE or not recent
+                               or pages >= settings.REDDIT_CRAWL_MAX_PAGES)
+            checkpoint.save()
+        logger.info('Crawled %d pages of r/hiphopheads/%s', pages, listing)
@@ -0,0 +1,387 @@
+'''
+Matching of the crawled posts to their releases on Spotify and publishing of
+the generation that lists them. Only the refresh worker and the stream
+listener use it, so the Spotify client is never imported by the web workers.
+'''
+import datetime as dt
+import logging
+
+from django.conf import settings
+from django.db import models, transaction
+from django.utils import timezone
+
+from .lookups import artistAlbums, fullAlbums, searchArtist
+from .matching import bestMatch
+from .metrics import metrics
+from .models import (
+    currentGeneration, forgetRefreshState, getLastThursday, loadRefreshState, publishGeneration, redditPost,
+    refreshGeneration, spotifyAlbum, utc_to_local
+)
+from .reddit import generationPosts, getRedditObjects, saveRedditPosts
+from .spotify import getSpotifyClient, resolveConcurrently
+from .titles import parseTitle
+
+logger = logging.getLogger(__name__)
+
+
+def getPreviousMatches(posts):
+    '''
+    Looks up the spotifyAlbums that earlier refreshes matched to posts. A match
+        is only reused while the post's title is unchanged.
+
+    :param posts (list): The redditPosts of the generation being built
+    :return (dict): The matched spotifyAlbum for every post id that has one
+    '''
+    titles = {post.post_id: post.title for post in posts}
+    matched_uris = {}
+    # Latest generation first, so the most recent match of a post wins
+    for post_id, title, album_uri in (redditPost.objects.filter(post_id__in=list(titles)).exclude(album_uri='')
+                                      .order_by('-generation_id').values_list('post_id', 'title', 'album_uri')):
+        if titles[post_id] == title:
+            matched_uris.setdefault(post_id, album_uri)
+
+    albums = {}
+    for album in spotifyAlbum.objects.filter(uri__in=set(matched_uris.values())).order_by('generation_id'):
+        albums[album.uri] = album
+    return {post_id: albums[uri] for post_id, uri in matched_uris.items() if uri in albums}
+
+def copyAlbum(album, generation):
+    '''
+    :return (spotifyAlbum): An unsaved copy of album in generation
+    '''
+    return spotifyAlbum(generation=generation, artist=album.artist, name=album.name, release=album.release,
+                        url=album.url, uri=album.uri, image_url=album.image_url, album_type=album.album_type,
+                        confidence=album.confidence)
+
+
+# The release_date_precision values of the Spotify Api: day, month and year
+RELEASE_DATE_FORMATS = ('%Y-%m-%d', '%Y-%m', '%Y')
+
+
+def getDateTime(str_time):
+    '''
+    :param str_time (string): A date represented in yyyy-mm-dd format, Spotify
+        shortens it to yyyy-mm or yyyy for releases with a less precise date
+    :return (datetime): The corresponding datetime object for str_time
+    '''
+    for date_format in RELEASE_DATE_FORMATS:
+        try:
+            return dt.datetime.strptime(str_time, date_format).date()
+        except ValueError:
+            continue
+    raise ValueError('Unknown release date format: {0}'.format(str_time))
+
+
+def isRecentRelease(album, since):
+    '''
+    :param album (dict): A Spotify album object with a 'release_date'
+    :param since (date): The first day of the release window
+    :return (bool): Whether album came out in the release window. A release
+        whose date is only known to the month or year counts if that month
+        or year reaches into the window, one with an unparseable date (e.g.
+        '0000') does not.
+    '''
+    release_date = album['release_date']
+    try:
+        return getDateTime(release_date) >= getDateTime(since.isoformat()[:len(release_date)])
+    except ValueError:
+        return False
+
+
+def noHeartbeat():
+    '''
+    The heartbeat of a refresh that is not guarded by a lock
+    '''
+
+
+def getSpotifyAlbums(heartbeat=noHeartbeat):
+    '''
+    This function retrieves the newest Spotify releases based on what is
+        trending on the hiphopheads subreddit. A new generation is started, or
+        the one an interrupted refresh left unpublished is resumed, and the
+        redditPosts are crawled into it. Posts that an earlier refresh already
+        matched keep their spotifyAlbum, only new or retitled posts are
+        resolved on Spotify, see matchPosts(). The posts are matched and their
+        spotifyAlbums inserted INGESTION_BATCH_SIZE posts at a time, so memory
+        does not grow with the number of crawled pages. Only then is the new
+        generation shown, until then readers keep seeing the previous one.
+
+    :param heartbeat (function): Called before every write to the generation.
+        refreshAlbums() extends its lock with it, and it raises to abort the
+        refresh once another process may be building the same generation.
+    :return (refreshGeneration): The generation that is now shown
+    '''
+    week = getLastThursday(utc_to_local(timezone.now())).date()
+    generation = unpublishedGeneration(week)
+    if generation is None:
+        generation = refreshGeneration.objects.create(week=week)
+    else:
+        logger.info('Resuming the unpublished refresh of %s', generation)
+    with metrics.stage('crawl'):
+        getRedditObjects(generation, heartbeat)
+
+    # The posts are matched and their releases inserted a chunk at a time. The
+    # generation is not shown yet, so nobody sees it half done.
+    for posts in generationPosts(generation, settings.INGESTION_BATCH_SIZE):
+        matches = matchPosts(posts, generation)
+        heartbeat()
+        with metrics.stage('save_matches'):
+            saveMatches(generation, posts, matches)
+
+    heartbeat()
+    with transaction.atomic():
+        publishGeneration(generation)
+
+    return generation
+
+
+def matchPosts(posts, generation):
+    '''
+    Posts that an earlier refresh already matched keep their spotifyAlbum,
+        only new or retitled posts are resolved on Spotify, concurrently.
+
+    :param posts (list): Saved redditPosts of generation
+    :param generation (refreshGeneration): The generation the albums are built for
+    :return (dict): The unsaved spotifyAlbum of every post id that was matched
+    '''
+    with metrics.stage('reuse'):
+        previous = getPreviousMatches(posts)
+
+    matches = {}
+    unmatched = []
+    for post in posts:
+        if post.post_id in previous:
+            matches[post.post_id] = copyAlbum(previous[post.post_id], generation)
+        else:
+            unmatched.append(post)
+    metrics.count('posts', len(matches), outcome='reused')
+
+    with metrics.stage('resolve'):
+        resolved = resolveSpotifyAlbums(unmatched)
+    for post, album in zip(unmatched, resolved):
+        if album is not None:
+            matches[post.post_id] = album
+    logger.info('Matched %d of %d posts, %d reused from earlier refreshes',
+                len(matches), len(posts), len(posts) - len(unmatched))
+    return matches
+
+
+def saveMatches(generation, posts, matches):
+    '''
+    Stores which release every post was matched to and inserts the releases
+        that generation does not list yet, in batches.
+
+    :param generation (refreshGeneration): The generation of posts
+    :param posts (list): Saved redditPosts of generation
+    :param matches (dict): The unsaved spotifyAlbum of every matched post id
+    :return (int): The number of inserted spotifyAlbums
+    '''
+    albums = {}
+    matched_posts = {}
+    for post in posts:
+        album = matches.get(post.post_id)
+        if album is not None:
+            matched_posts[post.pk] = album.uri
+            # Several posts can point at the same release, it is only listed once
+            albums.setdefault(album.uri, album)
+    if not matched_posts:
+        return 0
+
+    # One UPDATE for all posts, Django 2.0 has no bulk_update
+    redditPost.objects.filter(pk__in=list(matched_posts)).update(album_uri=models.Case(
+        *[models.When(pk=pk, then=models.Value(uri)) for pk, uri in matched_posts.items()],
+        output_field=models.CharField()))
+
+    for uri in generation.albums.filter(uri__in=list(albums)).values_list('uri', flat=True):
+        del albums[uri]
+    spotifyAlbum.objects.bulk_create(list(albums.values()), batch_size=settings.INGESTION_BATCH_SIZE)
+    return len(albums)
+
+
+def addStreamedPosts(records):
+    '''
+    Adds posts that arrive between two weekly refreshes to the generation that
+        is shown, together with the releases they match. The generation's
+        version changes, so the cached listing is replaced right away.
+
+    :param records (list): redditRecords of new FRESH posts
+    :return (int): The number of releases added to the listing
+    '''
+    # Read past the cache, the weekly refresh may just have published a new generation
+    generation = loadRefreshState()['generation']
+    if generation is None:
+        logger.info('No releases are shown yet, waiting for the first weekly refresh')
+        return 0
+
+    posts = list(generation.posts.filter(post_id__in=saveRedditPosts(generation, records)))
+    if not posts:
+        return 0
+    matches = matchPosts(posts, generation)
+
+    with transaction.atomic():
+        added = saveMatches(generation, posts, matches)
+        if added:
+            generation.save(update_fields=['modified'])
+            forgetRefreshState()
+    return added
+
+
+def unpublishedGeneration(week):
+    '''
+    :param week (date): The week being refreshed
+    :return (refreshGeneration): The newest generation of week that was started
+        after the shown one but never published, None if there is none
+    '''
+    pending = refreshGeneration.objects.filter(week=week)
+    generation = currentGeneration()
+    if generation is not None:
+        pending = pending.filter(created__gt=generation.created)
+    return pending.order_by('-created').first()
+
+
+def convertRedditSpotify(album):
+    '''
+    Resolves a single redditPost on Spotify and saves the spotifyAlbum if
+        one was found.
+
+    :param album (redditPost): The redditPost corresponding to an artist's new release
+    :return (spotifyAlbum): The saved spotifyAlbum or None
+    '''
+    spotify_album = resolveSpotifyAlbum(album)
+    if spotify_album is not None:
+        spotify_album.save()
+        album.album_uri = spotify_album.uri
+        if album.pk is not None:
+            album.save(update_fields=['album_uri'])
+    return spotify_album
+
+
+def resolveSpotifyAlbum(album):
+    '''
+    :param album (redditPost): The redditPost corresponding to an artist's new release
+    :return (spotifyAlbum): The unsaved spotifyAlbum or None if there was no match
+    '''
+    return resolveSpotifyAlbums([album])[0]
+
+
+def resolveSpotifyAlbums(posts):
+    '''
+    This function uses the Spotify Web Api through the spotipy python wrapper. It
+        resolves posts in two stages. First the artist of every post is searched
+        and the release whose title matches the post best is taken as the
+        candidate, concurrently and answered from the lookup cache when
+        possible. Then the full albums of
+        all candidates are fetched together, 20 per request, and checked with
+        checkCorrectAlbum(). It does not touch the database so it can run in
+        any thread.
+
+    :param posts (list): The redditPosts corresponding to artists' new releases
+    :return (list): The unsaved spotifyAlbum of every post, None for the posts
+        that had no match
+    '''
+    if not posts:
+        return []
+
+    spotify = getSpotifyClient()
+    candidates = resolveConcurrently(lambda post: tryFindCandidate(post, spotify), posts)
+    albums = fullAlbums(spotify, [match.album['id'] for _, match in filter(None, candidates)])
+
+    resolved = []
+    for post, candidate in zip(posts, candidates):
+        if candidate is None:
+            resolved.append(None)
+            continue
+
+        artist, match = candidate
+        album = albums.get(match.album['id'])
+        if album is None or not checkCorrectAlbum(album):
+            metrics.count('posts', outcome='album_unavailable')
+            resolved.append(None)
+        else:
+            metrics.count('posts', outcome='matched')
+            resolved.append(buildSpotifyAlbum(post, artist, album, match.confidence))
+    return resolved
+
+
+def tryFindCandidate(post, spotify):
+    '''
+    findCandidate() for one post of a whole chunk. A post whose lookups still
+        fail after the Spotify client's retries is logged and left unmatched,
+        so it does not abort the refresh of every other post.
+
+    :return (tuple): See findCandidate(), None if it failed
+    '''
+    try:
+        return findCandidate(post, spotify)
+    except Exception:
+        logger.exception('Could not resolve the post %s', getattr(post, 'post_id'))
+        metrics.count('posts', outcome='error')
+        return None
+
+
+def findCandidate(post, spotify):
+    '''
+    We extract the artist and album names from the post's title with
+        parseTitle(), search for the artist and score their releases of the
+        last REDDIT_CRAWL_WINDOW_DAYS days against the album name in one
+        pass. Older releases are left out, so a post about a release that is
+        not on Spotify yet does not match an earlier one with a similar title.
+
+    :param post (redditPost): The redditPost corresponding to an artist's new release
+    :param spotify (Spotify): The Spotify client
+    :return (tuple): The artist name and the albumMatch of the release with the
+        most similar title, None if no title is similar enough
+    '''
+    parsed = parseTitle(getattr(post, 'title'))
+    if parsed is None or parsed.artist is None:
+        metrics.count('posts', outcome='unparsed_title')
+        return None
+
+    artist_spotify = searchArtist(spotify, parsed.artist)
+
+    if artist_spotify['total'] == 0:
+        # The artist search was a failure
+        metrics.count('posts', outcome='artist_not_found')
+        return None
+
+    id = artist_spotify['items'][0]['id']
+
+    since = timezone.localdate() - dt.timedelta(days=settings.REDDIT_CRAWL_WINDOW_DAYS)
+    recent_albums = [album for album in artistAlbums(spotify, id, parsed.album_type) if isRecentRelease(album, since)]
+
+    match = bestMatch(parsed.title, recent_albums)
+    if match.album is None:
+        metrics.count('posts', outcome='no_releases')
+        return None
+    if match.confidence < settings.SPOTIFY_MATCH_THRESHOLD:
+        metrics.count('posts', outcome='low_confidence')
+        return None
+
+    return parsed.artist, match
+
+
+def buildSpotifyAlbum(post, artist, album, confidence):
+    '''
+    :param post (redditPost): The matched redditPost
+    :param artist (string): The artist name from the post
+    :param album (dict): The full album, see lookups.fullAlbums()
+    :param confidence (float): How well the album's title matches the post
+    :return (spotifyAlbum): The unsaved spotifyAlbum in the generation of post
+    '''
+    url = "https://open.spotify.com/embed/album/" + album['uri'].split(':')[-1]
+    # The medium (300px) cover if Spotify has it, images are ordered largest first
+    image = album['images'][1] if len(album['images']) > 1 else album['images'][0]
+    return spotifyAlbum(generation_id=post.generation_id, artist=artist, name=album['name'],
+                        release=getDateTime(album['release_date']), url=url, uri=album['uri'],
+                        image_url=image['url'], album_type=album['album_type'], confidence=confidence)
+
+
+def checkCorrectAlbum(album):
+    '''
+    The titles were already compared by findCandidate(), this checks that the
+        full album of the matched release can actually be listed.
+
+    :param album (dict): The full album, see lookups.fullAlbums()
+    :return (bool): check if album has tracks and cover art on Spotify
+    '''
+    return album['total_tracks'] > 0 and bool(album['images'])
@@ -0,0 +1,316 @@
+'''
+Recording and replaying of the Reddit and Spotify responses of a refresh.
+
+A refresh run with the recording clients stores every response it gets in
+JSON cassettes. The replaying clients answer from those cassettes, optionally
+after an injected delay, so the whole refresh can be run and timed without
+network access or credentials:
+
+    $ python manage.py replayrefresh --record
+    $ python manage.py replayrefresh --latency 0.05 --runs 3
+'''
+import datetime as dt
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.test.utils import override_settings
+
+from . import lookups
+from .reddit import buildSubreddit
+from .releases import getSpotifyAlbums
+from .spotify import buildSpotifyClient, resetSpotifyClient
+
+REPLAY_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'replay'}}
+
+# The Spotify client methods the refresh calls
+SPOTIFY_METHODS = ('search', 'artist_albums', 'albums')
+
+# The parts of a praw submission the refresh reads
+replaySubmission = namedtuple('replaySubmission', ['title', 'score', 'id', 'fullname', 'url', 'num_comments',
+                                                   'created', 'created_utc'])
+
+
+class ReplayMiss(LookupError):
+    '''
+    Raised when a replaying client is asked for a response that was never recorded
+    '''
+
+
+class Cassette(object):
+    '''
+    Recorded responses of one service, keyed by the call that returned them
+    '''
+
+    def __init__(self, path, recorded_at=None, interactions=None):
+        self.path = path
+        self.recorded_at = recorded_at if recorded_at is not None else time.time()
+        self.interactions = interactions if interactions is not None else {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path):
+        '''
+        :param path (string): The JSON file of the cassette
+        :return (Cassette): The recorded cassette
+        '''
+        with open(path, encoding='utf-8') as cassette:
+            data = json.load(cassette)
+        return cls(path, data['recorded_at'], data['interactions'])
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, 'w', encoding='utf-8') as cassette:
+            json.dump({'recorded_at': self.recorded_at, 'interactions': self.interactions}, cassette,
+                      indent=1, sort_keys=True)
+
+    def record(self, key, response):
+        with self._lock:
+            self.interactions[key] = response
+
+    def play(self, key):
+        try:
+            return self.interactions[key]
+        except KeyError:
+            raise ReplayMiss('{0} has no response for {1}'.format(self.path, key))
+
+
+def callKey(method, *args, **kwargs):
+    '''
+    :return (string): The key a call is recorded under
+    '''
+    return json.dumps([method, args, kwargs], sort_keys=True)
+
+
+def cassettePath(service):
+    '''
+    :param service (string): 'reddit' or 'spotify'
+    :return (string): Path of the service's cassette in REPLAY_CASSETTE_DIR
+    '''
+    return os.path.join(settings.REPLAY_CASSETTE_DIR, service + '.json')
+
+
+def toReplaySubmission(submission):
+    '''
+    :param submission (praw.models.Submission): A post as praw returns it
+    :return (dict): The parts of the post the refresh reads
+    '''
+    return replaySubmission(title=submission.title, score=submission.score, id=submission.id,
+                            fullname=submission.fullname, url=submission.url,
+                            num_comments=submission.num_comments, created=submission.created,
+                            created_utc=submission.created_utc)._asdict()
+
+
+class RecordingSubreddit(object):
+    '''
+    Passes the listing requests of the refresh on to a praw subreddit and
+        records the submissions that come back
+    '''
+
+    def __init__(self, subreddit, cassette):
+        self.subreddit = subreddit
+        self.cassette = cassette
+
+    def listing(self, method, *args, **kwargs):
+        submissions = list(getattr(self.subreddit, method)(*args, **kwargs))
+        self.cassette.record(callKey(method, *args, **kwargs), [toReplaySubmission(post) for post in submissions])
+        return submissions
+
+    def hot(self, **kwargs):
+        return self.listing('hot', **kwargs)
+
+    def new(self, **kwargs):
+        return self.listing('new', **kwargs)
+
+    def search(self, query, **kwargs):
+        return self.listing('search', query, **kwargs)
+
+
+class ReplaySubreddit(object):
+    '''
+    Answers the listing requests of the refresh from a cassette. The posts are
+        moved forward in time by how long ago they were recorded, so they are
+        still inside the release window.
+    '''
+
+    def __init__(self, cassette, latency=0.0):
+        self.cassette = cassette
+        self.latency = latency
+        self.shift = time.time() - cassette.recorded_at
+
+    def listing(self, method, *args, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        try:
+            recorded = self.cassette.play(callKey(method, *args, **kwargs))
+        except ReplayMiss:
+            # A page that was never read during the recording is empty
+            return []
+        return [replaySubmission(**dict(post, created=post['created'] + self.shift,
+                                        created_utc=post['created_utc'] + self.shift)) for post in recorded]
+
+    def hot(self, **kwargs):
+        return self.listing('hot', **kwargs)
+
+    def new(self, **kwargs):
+        return self.listing('new', **kwargs)
+
+    def search(self, query, **kwargs):
+        return self.listing('search', query, **kwargs)
+
+
+class RecordingSpotify(object):
+    '''
+    Passes the requests of the refresh on to a Spotify client and records the
+        responses, safe to use from several threads
+    '''
+
+    def __init__(self, spotify, cassette):
+        self.spotify = spotify
+        self.cassette = cassette
+
+    def __getattr__(self, method):
+        if method not in SPOTIFY_METHODS:
+            raise AttributeError(method)
+
+        def call(*args, **kwargs):
+            response = getattr(self.spotify, method)(*args, **kwargs)
+            self.cassette.record(callKey(method, *args, **kwargs), response)
+            return response
+        return call
+
+
+def shiftReleaseDate(album, days):
+    '''
+    :param album (dict): A Spotify album object, None for an unknown id
+    :param days (int): Days the release is moved forward by
+    :return (dict): A copy of album released days later. Dates only known to
+        the month or year are left alone.
+    '''
+    if album is None or album.get('release_date_precision', 'day') != 'day' or len(album['release_date']) != 10:
+        return album
+    released = dt.datetime.strptime(album['release_date'], '%Y-%m-%d') + dt.timedelta(days=days)
+    return dict(album, release_date=released.strftime('%Y-%m-%d'))
+
+
+class ReplaySpotify(object):
+    '''
+    Answers the requests of the refresh from a cassette, each after latency
+        seconds. Like the posts of ReplaySubreddit the releases are moved
+        forward by how long ago they were recorded, so the recently released
+        ones are still inside the release window.
+    '''
+
+    def __init__(self, cassette, latency=0.0):
+        self.cassette = cassette
+        self.latency = latency
+        self.shift = dt.timedelta(seconds=time.time() - cassette.recorded_at).days
+
+    def __getattr__(self, method):
+        if method not in SPOTIFY_METHODS:
+            raise AttributeError(method)
+
+        def call(*args, **kwargs):
+            if self.latency:
+                time.sleep(self.latency)
+            response = self.cassette.play(callKey(method, *args, **kwargs))
+            # artist_albums lists its releases as items, albums as albums
+            for key in ('items', 'albums'):
+                if key in response:
+                    response = dict(response, **{key: [shiftReleaseDate(album, self.shift)
+                                                       for album in response[key]]})
+            return response
+        return call
+
+
+_recording = {}
+
+
+def recordingCassette(service):
+    '''
+    :return (Cassette): The cassette a service is recorded into until
+        saveRecordings() is called, one per service
+    '''
+    path = cassettePath(service)
+    if path not in _recording:
+        _recording[path] = Cassette(path)
+    return _recording[path]
+
+
+def saveRecordings():
+    '''
+    Writes the recorded cassettes to REPLAY_CASSETTE_DIR
+    '''
+    while _recording:
+        _, cassette = _recording.popitem()
+        cassette.save()
+
+
+def recordingSubreddit():
+    return RecordingSubreddit(buildSubreddit(), recordingCassette('reddit'))
+
+
+def recordingSpotify():
+    return RecordingSpotify(buildSpotifyClient(), recordingCassette('spotify'))
+
+
+def replaySubreddit():
+    return ReplaySubreddit(Cassette.load(cassettePath('reddit')), settings.REPLAY_LATENCY)
+
+
+def replaySpotify():
+    return ReplaySpotify(Cassette.load(cassettePath('spotify')), settings.REPLAY_LATENCY)
+
+
+refreshTiming = namedtuple('refreshTiming', ['seconds', 'posts', 'albums', 'lookups'])
+
+
+def replayRefresh(record=False, cassette_dir=None, latency=None, cold=True):
+    '''
+    Runs the whole refresh against the replaying (or recording) clients. The
+        refresh runs in a transaction that is rolled back and with its own
+        cache, so neither the shown releases nor the lookup cache change.
+
+    :param record (bool): Record the responses of the live Apis instead
+    :param cold (bool): Start with an empty lookup cache, otherwise the
+        lookups of the previous replay in this process are reused. Recording
+        always starts cold so every response is recorded.
+    :param cassette_dir (string): Defaults to REPLAY_CASSETTE_DIR
+    :param latency (float): Seconds every replayed response is delayed by,
+        defaults to REPLAY_LATENCY
+    :return (refreshTiming): How long the refresh took and what it found
+    '''
+    overrides = {
+        'CACHES': REPLAY_CACHES,
+        'REDDIT_CLIENT_FACTORY': 'trendingAlbums.replay.' + ('recordingSubreddit' if record else 'replaySubreddit'),
+        'SPOTIFY_CLIENT_FACTORY': 'trendingAlbums.replay.' + ('recordingSpotify' if record else 'replaySpotify'),
+    }
+    if cassette_dir is not None:
+        overrides['REPLAY_CASSETTE_DIR'] = cassette_dir
+    if latency is not None:
+        overrides['REPLAY_LATENCY'] = latency
+
+    resetSpotifyClient()
+    try:
+        with override_settings(**overrides):
+            if cold or record:
+                cache.clear()
+            lookups.stats.reset()
+            with transaction.atomic():
+                start = time.perf_counter()
+                generation = getSpotifyAlbums()
+                seconds = time.perf_counter() - start
+                timing = refreshTiming(seconds, generation.posts.count(), generation.albums.count(),
+                                       lookups.stats.snapshot())
+                transaction.set_rollback(True)
+            if record:
+                saveRecordings()
+    finally:
+        _recording.clear()
+        resetSpotifyClient()
+    return timing
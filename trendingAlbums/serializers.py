@@ -0,0 +1,30 @@
+from rest_framework import serializers
+
+from .models import redditPost, spotifyAlbum
+
+
+class SpotifyAlbumSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = spotifyAlbum
+        fields = ('artist', 'name', 'album_type', 'release', 'url', 'uri', 'image_url', 'confidence')
+        read_only_fields = fields
+
+
+class RedditPostSerializer(serializers.ModelSerializer):
+
+    num_comments = serializers.IntegerField(source='comms_numm', read_only=True)
+
+    class Meta:
+        model = redditPost
+        fields = ('post_id', 'title', 'score', 'num_comments', 'url', 'timestamp', 'album_uri')
+        read_only_fields = fields
+
+
+def modelFields(serializer_class):
+    '''
+    :param serializer_class (ModelSerializer): A serializer of one of the models
+    :return (list): The model fields the serializer reads, for QuerySet.only()
+    '''
+    return [serializer_class._declared_fields[name].source if name in serializer_class._declared_fields else name
+            for name in serializer_class.Meta.fields]
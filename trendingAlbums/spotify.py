@@ -0,0 +1,195 @@
+'''
+Helpers for calling the Spotify Web Api from several threads at once.
+'''
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+import spotipy
+from requests.adapters import HTTPAdapter
+from spotipy.client import SpotifyException
+from spotipy.oauth2 import SpotifyClientCredentials
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from config.secrets import get_secret
+
+from .metrics import metrics
+
+
+class RateLimitGate(object):
+    '''
+    A pause shared by every thread talking to Spotify. When one request gets
+        rate limited the whole pool waits for the Retry-After period instead
+        of every thread hammering the Api until it gets limited as well.
+    '''
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._resume_at = 0.0
+
+    def pause(self, seconds):
+        '''
+        :param seconds (float): How long no request should be sent for
+        '''
+        with self._lock:
+            self._resume_at = max(self._resume_at, time.monotonic() + seconds)
+
+    def wait(self):
+        '''
+        Blocks until the current pause, if any, is over
+        '''
+        while True:
+            with self._lock:
+                remaining = self._resume_at - time.monotonic()
+            if remaining <= 0:
+                return
+            time.sleep(remaining)
+
+
+rateLimit = RateLimitGate()
+
+
+def isRetryable(error):
+    '''
+    :param error (SpotifyException): The error raised by a Spotify request
+    :return (bool): check if the request failed because of a rate limit or a
+        server error, which are worth retrying
+    '''
+    return error.http_status == 429 or 500 <= error.http_status < 600
+
+
+# Requests that timed out or could not connect, spotipy does not wrap them
+NETWORK_ERRORS = (requests.exceptions.Timeout, requests.exceptions.ConnectionError)
+
+
+class Spotify(spotipy.Spotify):
+    '''
+    A spotipy client whose GET requests back off together through
+        rateLimit and are also retried after timeouts and connection errors.
+        spotipy's own retry loop sleeps in every thread separately and
+        silently returns None once it runs out of retries, so it is replaced
+        here.
+    '''
+
+    def _get(self, url, args=None, payload=None, **kwargs):
+        if args:
+            kwargs.update(args)
+
+        delay = 1
+        retries = settings.SPOTIFY_MAX_RETRIES
+        while True:
+            rateLimit.wait()
+            try:
+                return self._internal_call('GET', url, payload, kwargs)
+            except SpotifyException as error:
+                if retries <= 0 or not isRetryable(error):
+                    raise
+                retries -= 1
+                metrics.count('api_retries', service='spotify', status=error.http_status)
+
+                if error.http_status == 429:
+                    rateLimit.pause(int(error.headers.get('Retry-After', delay)))
+                else:
+                    time.sleep(delay)
+            except NETWORK_ERRORS as error:
+                # Retried like a server error, the request may well get
+                # through on the next connection
+                if retries <= 0:
+                    raise
+                retries -= 1
+                metrics.count('api_retries', service='spotify', status=type(error).__name__)
+                time.sleep(delay)
+            delay *= 2
+
+
+class ClientCredentials(SpotifyClientCredentials):
+    '''
+    Client credentials that can be shared between threads. The token is
+        cached until shortly before it expires and only one thread at a
+        time can request a new one.
+    '''
+
+    def __init__(self, *args, **kwargs):
+        super(ClientCredentials, self).__init__(*args, **kwargs)
+        self._lock = threading.Lock()
+
+    def get_access_token(self):
+        with self._lock:
+            return super(ClientCredentials, self).get_access_token()
+
+
+class KeepAliveAdapter(HTTPAdapter):
+    '''
+    spotipy closes the connection adapter after every response
+        (r.connection.close()), which throws away the whole connection pool
+        and forces a new TCP and TLS handshake for the next request. This
+        adapter ignores that so the connections are kept alive and reused.
+    '''
+
+    def close(self):
+        pass
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def buildSpotifyClient():
+    '''
+    :return (Spotify): A new Spotify client with its own token cache and
+        a connection pool sized for SPOTIFY_CONCURRENCY threads
+    '''
+    session = requests.Session()
+    session.mount('https://', KeepAliveAdapter(pool_connections=1, pool_maxsize=settings.SPOTIFY_CONCURRENCY))
+    client_credentials_manager = ClientCredentials(client_id=get_secret("SPOTIFY_CLIENT_ID"),
+                                                   client_secret=get_secret("SPOTIFY_CLIENT_SECRET"))
+    return Spotify(client_credentials_manager=client_credentials_manager, requests_session=session,
+                   requests_timeout=settings.SPOTIFY_TIMEOUT)
+
+
+def getSpotifyClient():
+    '''
+    :return (Spotify): The Spotify client shared by the whole process. It is
+        built on first use by the SPOTIFY_CLIENT_FACTORY, buildSpotifyClient()
+        unless it is replaced by a recording or replaying one (see
+        trendingAlbums.replay), and safe to use from several threads.
+    '''
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = import_string(settings.SPOTIFY_CLIENT_FACTORY)()
+    return _client
+
+
+def resetSpotifyClient():
+    '''
+    Drops the shared Spotify client, the next getSpotifyClient() call
+        builds a new one
+    '''
+    global _client
+    with _client_lock:
+        _client = None
+
+
+def resolveConcurrently(resolve, items, workers=None):
+    '''
+    Runs resolve on every item in a bounded thread pool so that the Spotify
+        requests for different items overlap instead of running one after
+        another. resolve should only talk to Spotify, database writes belong
+        in the calling thread.
+
+    :param resolve (function): Called with every item
+    :param items (iterable): The items to resolve
+    :param workers (int): Maximum number of concurrent calls, defaults to the
+        SPOTIFY_CONCURRENCY setting
+    :return (list): The results of resolve in the same order as items
+    '''
+    if workers is None:
+        workers = settings.SPOTIFY_CONCURRENCY
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(resolve, items))
@@ -0,0 +1,121 @@
+'''
+Near real-time ingestion of new releases.
+
+Between two weekly refreshes ``python manage.py streamreleases`` listens to
+the submission stream of r/hiphopheads. FRESH posts are put on a bounded
+queue as they come in and added to the shown listing in small batches, so a
+release shows up within seconds instead of on the next Thursday.
+'''
+import logging
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from .reddit import checkFresh, getSubreddit, toRedditRecord
+from .releases import addStreamedPosts
+
+logger = logging.getLogger(__name__)
+
+
+def streamFreshPosts(subreddit, posts, stop):
+    '''
+    Puts the redditRecord of every new FRESH post on posts. When posts is full
+        this blocks, so the stream is only read as fast as the posts are
+        resolved. It does not touch the database so it can run in any thread.
+
+    :param subreddit (praw.models.Subreddit): The subreddit to listen to
+    :param posts (queue.Queue): Where the fresh posts are put
+    :param stop (threading.Event): Ends the stream once it is set
+    '''
+    stream = subreddit.stream.submissions(pause_after=0, skip_existing=True)
+    try:
+        while not stop.is_set():
+            for submission in stream:
+                # praw yields None whenever there are no new posts
+                if submission is None or stop.is_set():
+                    break
+                if checkFresh(submission.title):
+                    putUntilStopped(posts, toRedditRecord(submission), stop)
+            else:
+                return
+            stop.wait(settings.REDDIT_STREAM_PAUSE)
+    except Exception:
+        logger.exception('Reading the submission stream failed')
+
+
+def putUntilStopped(posts, record, stop):
+    '''
+    Waits for room on posts without ignoring stop
+    '''
+    while not stop.is_set():
+        try:
+            posts.put(record, timeout=1)
+            return
+        except queue.Full:
+            continue
+
+
+def takeBatch(posts, batch_size, max_wait):
+    '''
+    :param posts (queue.Queue): The queue the fresh posts arrive on
+    :param batch_size (int): Most records in one batch
+    :param max_wait (float): Seconds a batch waits for more records after
+        its first one arrived
+    :return (list): Between 1 and batch_size records, empty if none arrived
+        within max_wait
+    '''
+    try:
+        batch = [posts.get(timeout=max_wait)]
+    except queue.Empty:
+        return []
+
+    deadline = time.monotonic() + max_wait
+    while len(batch) < batch_size:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            batch.append(posts.get(timeout=remaining))
+        except queue.Empty:
+            break
+    return batch
+
+
+def runStream(subreddit=None, stop=None):
+    '''
+    Listens to the subreddit until stop is set or the stream fails. The stream
+        is read in a separate thread, the posts are resolved and saved in the
+        calling thread.
+
+    :param subreddit (praw.models.Subreddit): Defaults to getSubreddit()
+    :param stop (threading.Event): Ends the listener once it is set
+    '''
+    if subreddit is None:
+        subreddit = getSubreddit()
+    if stop is None:
+        stop = threading.Event()
+
+    posts = queue.Queue(maxsize=settings.REDDIT_STREAM_QUEUE_SIZE)
+    listener = threading.Thread(target=streamFreshPosts, args=(subreddit, posts, stop),
+                                name='reddit-stream', daemon=True)
+    listener.start()
+
+    try:
+        while listener.is_alive() or not posts.empty():
+            batch = takeBatch(posts, settings.REDDIT_STREAM_BATCH_SIZE, settings.REDDIT_STREAM_BATCH_WAIT)
+            if not batch:
+                continue
+
+            close_old_connections()
+            try:
+                logger.info('Added %d releases from %d streamed posts', addStreamedPosts(batch), len(batch))
+            except Exception:
+                logger.exception('Adding %d streamed posts failed', len(batch))
+            finally:
+                close_old_connections()
+    finally:
+        stop.set()
+        listener.join()
@@ -0,0 +1,43 @@
+from django.utils import timezone
+from factory import DjangoModelFactory, Faker, Sequence, SubFactory
+
+from trendingAlbums.models import redditPost, refreshGeneration, spotifyAlbum
+
+
+class RefreshGenerationFactory(DjangoModelFactory):
+
+    week = Faker("past_date")
+
+    class Meta:
+        model = refreshGeneration
+
+
+class RedditPostFactory(DjangoModelFactory):
+
+    generation = SubFactory(RefreshGenerationFactory)
+
+    title = Sequence(lambda n: f"[FRESH ALBUM] Artist {n} - Album {n}")
+    score = Faker("pyint")
+    post_id = Sequence(lambda n: f"post{n}")
+    url = Faker("url")
+    comms_numm = Faker("pyint")
+    timestamp = Faker("past_datetime", tzinfo=timezone.utc)
+
+    class Meta:
+        model = redditPost
+
+
+class SpotifyAlbumFactory(DjangoModelFactory):
+
+    generation = SubFactory(RefreshGenerationFactory)
+
+    artist = Faker("name")
+    name = Faker("sentence", nb_words=3)
+    release = Faker("past_datetime", tzinfo=timezone.utc)
+    url = Sequence(lambda n: f"https://open.spotify.com/embed/album/{n}")
+    uri = Sequence(lambda n: f"spotify:album:{n}")
+    image_url = Faker("image_url")
+    album_type = "album"
+
+    class Meta:
+        model = spotifyAlbum
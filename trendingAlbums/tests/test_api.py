@@ -0,0 +1,124 @@
+import datetime as dt
+
+import pytest
+from django.urls import reverse
+from django.utils.dateparse import parse_datetime
+
+from trendingAlbums.models import publishGeneration, weekGeneration
+from trendingAlbums.tests.factories import RedditPostFactory, RefreshGenerationFactory, SpotifyAlbumFactory
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def generation():
+    generation = RefreshGenerationFactory(week=dt.date(2018, 9, 6))
+    publishGeneration(generation)
+    return generation
+
+
+class TestAlbumList:
+
+    def test_lists_releases_of_shown_generation(self, client, generation):
+        album = SpotifyAlbumFactory(generation=generation, name="Astroworld", confidence=0.9)
+        SpotifyAlbumFactory(name="Old")
+
+        response = client.get(reverse("api-albums"))
+
+        assert response.status_code == 200
+        assert response["Content-Type"] == "application/json"
+        assert response.json()["results"] == [{
+            "artist": album.artist, "name": "Astroworld", "album_type": "album",
+            "release": response.json()["results"][0]["release"], "url": album.url, "uri": album.uri,
+            "image_url": album.image_url, "confidence": 0.9,
+        }]
+        assert parse_datetime(response.json()["results"][0]["release"]) == album.release
+
+    def test_filters_album_type(self, client, generation):
+        SpotifyAlbumFactory(generation=generation, album_type="album")
+        single = SpotifyAlbumFactory(generation=generation, album_type="single")
+
+        response = client.get(reverse("api-albums"), {"album_type": "single"})
+
+        assert [album["uri"] for album in response.json()["results"]] == [single.uri]
+
+    def test_pages_with_cursor(self, client, generation, settings):
+        settings.API_PAGE_SIZE = 2
+        albums = [SpotifyAlbumFactory(generation=generation) for _ in range(5)]
+        newest_first = sorted(albums, key=lambda album: (album.release, album.pk), reverse=True)
+
+        uris, url = [], reverse("api-albums")
+        while url:
+            page = client.get(url).json()
+            uris.extend(album["uri"] for album in page["results"])
+            url = page["next"]
+
+        assert uris == [album.uri for album in newest_first]
+
+    def test_reads_only_serialized_columns(self, client, generation, django_assert_max_num_queries):
+        SpotifyAlbumFactory(generation=generation)
+        client.get(reverse("home"))
+
+        # Besides the savepoint of the request's transaction
+        with django_assert_max_num_queries(3) as captured:
+            client.get(reverse("api-albums"))
+
+        selects = [query["sql"] for query in captured.captured_queries if query["sql"].startswith("SELECT")]
+        assert len(selects) == 1
+        assert '"created"' not in selects[0]
+
+    def test_answers_conditional_get(self, client, generation):
+        SpotifyAlbumFactory(generation=generation)
+        response = client.get(reverse("api-albums"))
+
+        assert "public" in response["Cache-Control"]
+        assert client.get(reverse("api-albums"), HTTP_IF_NONE_MATCH=response["ETag"]).status_code == 304
+
+        generation.save()
+        publishGeneration(generation)
+
+        assert client.get(reverse("api-albums"), HTTP_IF_NONE_MATCH=response["ETag"]).status_code == 200
+
+    def test_empty_before_first_refresh(self, client):
+        response = client.get(reverse("api-albums"))
+
+        assert response.status_code == 200
+        assert response.json()["results"] == []
+
+
+class TestWeekFilter:
+
+    def test_lists_earlier_week(self, client, generation):
+        earlier = RefreshGenerationFactory(week=dt.date(2018, 8, 30))
+        earlier.created = generation.created - dt.timedelta(weeks=1)
+        earlier.save()
+        album = SpotifyAlbumFactory(generation=earlier)
+        SpotifyAlbumFactory(generation=generation)
+
+        response = client.get(reverse("api-albums"), {"week": "2018-09-03"})
+
+        assert [album["uri"] for album in response.json()["results"]] == [album.uri]
+
+    def test_week_of_any_day(self, generation):
+        assert weekGeneration(dt.date(2018, 9, 6)) == generation
+        assert weekGeneration(dt.date(2018, 9, 12)) == generation
+        assert weekGeneration(dt.date(2018, 9, 13)) is None
+        assert weekGeneration(dt.date(2018, 9, 5)) is None
+
+    def test_rejects_invalid_week(self, client, generation):
+        response = client.get(reverse("api-posts"), {"week": "last week"})
+
+        assert response.status_code == 400
+        assert "week" in response.json()
+
+
+class TestPostList:
+
+    def test_lists_posts_newest_first(self, client, generation):
+        older = RedditPostFactory(generation=generation, timestamp=dt.datetime(2018, 9, 7, tzinfo=dt.timezone.utc))
+        newer = RedditPostFactory(generation=generation, timestamp=dt.datetime(2018, 9, 8, tzinfo=dt.timezone.utc))
+
+        results = client.get(reverse("api-posts")).json()["results"]
+
+        assert [post["post_id"] for post in results] == [newer.post_id, older.post_id]
+        assert results[0]["num_comments"] == newer.comms_numm
@@ -0,0 +1,69 @@
+from unittest import mock
+
+import pytest
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+
+from trendingAlbums.ingestion import REFRESH_LOCK_KEY, refreshAlbums
+from trendingAlbums.locks import LockLost, cacheLock
+
+pytestmark = pytest.mark.django_db
+
+
+class TestRefreshAlbums:
+
+    def test_refreshes_when_ready(self):
+        with mock.patch("trendingAlbums.ingestion.readyToUpdate", return_value=True), \
+                mock.patch("trendingAlbums.ingestion.getSpotifyAlbums") as refresh:
+            assert refreshAlbums()
+
+        refresh.assert_called_once_with(heartbeat=mock.ANY)
+
+    def test_skips_when_not_ready(self):
+        with mock.patch("trendingAlbums.ingestion.readyToUpdate", return_value=False), \
+                mock.patch("trendingAlbums.ingestion.getSpotifyAlbums") as refresh:
+            assert not refreshAlbums()
+
+        refresh.assert_not_called()
+
+    def test_skips_while_another_refresh_runs(self):
+        with mock.patch("trendingAlbums.ingestion.readyToUpdate", return_value=True), \
+                mock.patch("trendingAlbums.ingestion.getSpotifyAlbums") as refresh, \
+                cacheLock(REFRESH_LOCK_KEY, 60):
+            assert not refreshAlbums()
+
+        refresh.assert_not_called()
+
+    def test_refresh_extends_its_lock(self):
+        def refresh(heartbeat):
+            cache.set(REFRESH_LOCK_KEY, cache.get(REFRESH_LOCK_KEY), 1)
+            heartbeat()
+            # The lock is stored with the full timeout again
+            assert cache.set.call_args == mock.call(REFRESH_LOCK_KEY, mock.ANY, settings.REFRESH_LOCK_TIMEOUT)
+
+        with mock.patch("trendingAlbums.ingestion.readyToUpdate", return_value=True), \
+                mock.patch("trendingAlbums.ingestion.getSpotifyAlbums", side_effect=refresh), \
+                mock.patch.object(cache, "set", wraps=cache.set):
+            assert refreshAlbums()
+
+    def test_refresh_stops_once_its_lock_is_taken(self):
+        def refresh(heartbeat):
+            # The lock expired and another worker took it
+            cache.set(REFRESH_LOCK_KEY, "someone-else")
+            heartbeat()
+
+        with mock.patch("trendingAlbums.ingestion.readyToUpdate", return_value=True), \
+                mock.patch("trendingAlbums.ingestion.getSpotifyAlbums", side_effect=refresh), \
+                pytest.raises(LockLost):
+            refreshAlbums()
+
+        assert cache.get(REFRESH_LOCK_KEY) == "someone-else"
+        cache.delete(REFRESH_LOCK_KEY)
+
+    def test_command_runs_once(self):
+        with mock.patch("trendingAlbums.management.commands.refreshalbums.refreshAlbums",
+                        return_value=False) as refresh:
+            call_command("refreshalbums")
+
+        refresh.assert_called_once_with()
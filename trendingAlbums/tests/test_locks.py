@@ -0,0 +1,42 @@
+import pytest
+from django.core.cache import cache
+
+from trendingAlbums.locks import LockLost, cacheLock
+
+
+def test_lock_is_exclusive():
+    with cacheLock("test-lock", 60) as first:
+        with cacheLock("test-lock", 60) as second:
+            assert first
+            assert not second
+
+    with cacheLock("test-lock", 60) as again:
+        assert again
+
+
+def test_lock_does_not_release_foreign_token():
+    with cacheLock("test-lock", 60) as acquired:
+        assert acquired
+        cache.set("test-lock", "someone-else")
+
+    assert cache.get("test-lock") == "someone-else"
+    cache.delete("test-lock")
+
+
+def test_extended_lock_is_kept():
+    with cacheLock("test-lock", 60) as lock:
+        lock.extend()
+
+        assert cache.get("test-lock") == lock.token
+
+    assert cache.get("test-lock") is None
+
+
+def test_expired_lock_can_not_be_extended():
+    with cacheLock("test-lock", 60) as lock:
+        cache.delete("test-lock")
+
+        with pytest.raises(LockLost):
+            lock.extend()
+
+    assert cache.get("test-lock") is None
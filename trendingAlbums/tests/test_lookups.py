@@ -0,0 +1,67 @@
+from unittest import mock
+
+import pytest
+from trendingAlbums import lookups
+
+
+@pytest.fixture(autouse=True)
+def reset_stats():
+    lookups.stats.reset()
+    yield
+    lookups.stats.reset()
+
+
+def test_normalize_name():
+    assert lookups.normalizeName("  Travis   Scott ") == "travis scott"
+
+
+def test_repeat_lookup_does_not_call_spotify():
+    spotify = mock.Mock()
+    spotify.search.return_value = {"artists": {"total": 1, "items": [{"id": "1"}]}}
+
+    first = lookups.searchArtist(spotify, "Travis Scott")
+    second = lookups.searchArtist(spotify, "travis  scott")
+
+    assert first == second == {"total": 1, "items": [{"id": "1"}]}
+    spotify.search.assert_called_once_with(q="artist:Travis Scott", type="artist")
+    assert lookups.stats.snapshot() == {"artist": {"hits": 1, "misses": 1}}
+
+
+def test_empty_results_are_cached():
+    spotify = mock.Mock()
+    spotify.artist_albums.return_value = {"items": []}
+
+    assert lookups.artistAlbums(spotify, "1", "album") == []
+    assert lookups.artistAlbums(spotify, "1", "album") == []
+
+    spotify.artist_albums.assert_called_once_with("1", album_type="album")
+
+
+def test_album_types_are_cached_separately():
+    spotify = mock.Mock()
+    spotify.artist_albums.return_value = {"items": []}
+
+    lookups.artistAlbums(spotify, "1", "album")
+    lookups.artistAlbums(spotify, "1", "single")
+
+    assert spotify.artist_albums.call_count == 2
+
+
+def test_full_albums_are_fetched_in_batches_of_twenty():
+    spotify = mock.Mock()
+    spotify.albums.side_effect = lambda ids: {"albums": [
+        None if album_id == "unknown" else {"id": album_id, "uri": "spotify:album:" + album_id, "name": album_id,
+                                            "album_type": "album", "release_date": "2018", "images": [],
+                                            "tracks": {"total": 1, "items": [{}]}}
+        for album_id in ids]}
+    ids = [str(n) for n in range(24)] + ["unknown"]
+
+    albums = lookups.fullAlbums(spotify, ids)
+
+    assert sorted(len(call[0][0]) for call in spotify.albums.call_args_list) == [5, 20]
+    assert set(albums) == set(ids) - {"unknown"}
+    assert albums["3"]["total_tracks"] == 1 and "tracks" not in albums["3"]
+
+    spotify.albums.reset_mock()
+    assert lookups.fullAlbums(spotify, ["3", "4"]) == {"3": albums["3"], "4": albums["4"]}
+    spotify.albums.assert_not_called()
@@ -0,0 +1,37 @@
+import pytest
+
+from trendingAlbums.matching import CandidateIndex, bestMatch, normalizeTitle
+
+
+@pytest.mark.parametrize("title, expected", [
+    ("SICKO MODE ft. Drake", "sicko mode"),
+    ("Ye vs. the People (feat. T.I.)", "ye vs the people"),
+    ("FM! (Deluxe)", "fm"),
+    ("Tha Carter V - Deluxe Edition", "tha carter v"),
+    ("Beyoncé  &  JAY-Z", "beyonce jayz"),
+])
+def test_normalize_title(title, expected):
+    assert normalizeTitle(title) == expected
+
+
+def test_best_match_compares_all_releases():
+    albums = [{"name": "Self Care"}, {"name": "Swimming (Deluxe)"}, {"name": "Small Worlds"}]
+
+    match = bestMatch("Swimming", albums)
+
+    assert match.album is albums[1]
+    assert match.confidence == 1.0
+
+
+def test_close_titles_score_below_one():
+    match = bestMatch("Nice For Wat", [{"name": "Nice For What"}])
+
+    assert 0.8 < match.confidence < 1.0
+
+
+def test_index_only_scores_releases_sharing_a_word():
+    index = CandidateIndex([{"name": "Scorpion"}, {"name": "More Life"}, {"name": "Views"}])
+
+    assert index.candidates("more life") == [1]
+    assert index.candidates("nothing was the same") == [0, 1, 2]
+    assert bestMatch("Thank Me Later", []).album is None
@@ -0,0 +1,77 @@
+import pytest
+from django.urls import reverse
+
+from trendingAlbums.ingestion import refreshAlbums
+from trendingAlbums.metrics import RefreshMetrics, lastMetrics, renderPrometheus
+from trendingAlbums.spotify import resetSpotifyClient
+
+
+def test_counts_are_kept_per_label():
+    metrics = RefreshMetrics()
+    metrics.count("posts", outcome="matched")
+    metrics.count("posts", 2, outcome="matched")
+    metrics.count("posts", outcome="low_confidence")
+    with metrics.stage("crawl"):
+        pass
+
+    snapshot = metrics.snapshot()
+
+    assert {(count["labels"]["outcome"], count["value"]) for count in snapshot["counts"]} == {
+        ("matched", 3), ("low_confidence", 1)}
+    assert snapshot["stages"]["crawl"] >= 0
+
+
+def test_render_prometheus():
+    snapshot = {"stages": {"crawl": 1.5}, "finished": 1533340800.0,
+                "counts": [{"name": "api_calls", "labels": {"service": "spotify", "method": 'a"b'}, "value": 4}]}
+
+    assert renderPrometheus(snapshot).splitlines() == [
+        '# TYPE weeklydrop_refresh_api_calls gauge',
+        'weeklydrop_refresh_api_calls{method="a\\"b",service="spotify"} 4.0',
+        '# TYPE weeklydrop_refresh_finished_timestamp_seconds gauge',
+        'weeklydrop_refresh_finished_timestamp_seconds 1533340800.0',
+        '# TYPE weeklydrop_refresh_stage_seconds gauge',
+        'weeklydrop_refresh_stage_seconds{stage="crawl"} 1.5',
+    ]
+
+
+@pytest.mark.django_db
+class TestRefreshMetrics:
+
+    @pytest.fixture(autouse=True)
+    def replayed_apis(self, settings):
+        settings.REDDIT_CLIENT_FACTORY = "trendingAlbums.replay.replaySubreddit"
+        settings.SPOTIFY_CLIENT_FACTORY = "trendingAlbums.replay.replaySpotify"
+        resetSpotifyClient()
+        yield
+        resetSpotifyClient()
+
+    def count(self, snapshot, name, **labels):
+        return sum(count["value"] for count in snapshot["counts"]
+                   if count["name"] == name and labels.items() <= count["labels"].items())
+
+    def test_refresh_records_stages_calls_and_outcomes(self):
+        assert refreshAlbums()
+
+        snapshot = lastMetrics()
+        assert {"refresh", "crawl", "filter", "save_posts", "reuse", "resolve", "save_matches", "prune"} <= set(
+            snapshot["stages"])
+        assert self.count(snapshot, "api_calls", service="reddit") == 3
+        assert self.count(snapshot, "api_calls", service="spotify", method="full_albums") == 1
+        assert self.count(snapshot, "posts", outcome="matched") == 2
+        # Their releases with that title came out before the release window
+        assert self.count(snapshot, "posts", outcome="no_releases") == 2
+        assert self.count(snapshot, "posts", outcome="artist_not_found") == 1
+        assert self.count(snapshot, "lookup_cache", kind="artist", outcome="misses") == 5
+
+    def test_endpoint_requires_the_token(self, client, settings):
+        refreshAlbums()
+
+        assert client.get(reverse("metrics")).status_code == 404
+        settings.METRICS_TOKEN = "secret"
+        assert client.get(reverse("metrics"), HTTP_AUTHORIZATION="Bearer wrong").status_code == 403
+
+        response = client.get(reverse("metrics"), HTTP_AUTHORIZATION="Bearer secret")
+        assert response.status_code == 200
+        assert response["Content-Type"].startswith("text/plain; version=0.0.4")
+        assert 'weeklydrop_refresh_posts{outcome="matched"} 2.0' in response.content.decode()
@@ -0,0 +1,116 @@
+import datetime as dt
+import importlib
+
+import pytest
+
+from django.apps import apps
+from django.core.cache import cache
+from django.utils import timezone
+
+from trendingAlbums.models import (
+    currentAlbums, currentGeneration, getLastThursday, groupReleases, publishGeneration, pruneGenerations,
+    readyToUpdate, refreshDueAt, refreshGeneration, refreshState, spotifyAlbum, utc_to_local
+)
+from trendingAlbums.tests.factories import RefreshGenerationFactory, SpotifyAlbumFactory
+
+pytestmark = pytest.mark.django_db
+
+
+class TestGenerations:
+
+    def test_nothing_is_shown_before_the_first_refresh(self):
+        SpotifyAlbumFactory()
+
+        assert currentGeneration() is None
+        assert not currentAlbums().exists()
+        assert readyToUpdate()
+
+    def test_only_the_current_generation_is_shown(self):
+        shown = SpotifyAlbumFactory()
+        SpotifyAlbumFactory()
+
+        publishGeneration(shown.generation)
+
+        assert list(currentAlbums()) == [shown]
+
+    def test_not_ready_until_next_thursday(self):
+        generation = RefreshGenerationFactory()
+        publishGeneration(generation)
+
+        assert not readyToUpdate()
+
+        refreshState.objects.update(next_refresh=timezone.now() - dt.timedelta(minutes=1))
+        cache.clear()
+
+        assert readyToUpdate()
+
+    def test_ready_check_does_not_query(self, django_assert_num_queries):
+        publishGeneration(RefreshGenerationFactory())
+        readyToUpdate()
+
+        with django_assert_num_queries(0):
+            assert not readyToUpdate()
+            assert currentGeneration() is not None
+
+    def test_prune_keeps_recent_weeks(self, settings):
+        settings.REFRESH_HISTORY_WEEKS = 2
+        shown = RefreshGenerationFactory(week=dt.date(2018, 9, 20))
+        recent = RefreshGenerationFactory(week=dt.date(2018, 9, 6))
+        old = SpotifyAlbumFactory(generation__week=dt.date(2018, 8, 30)).generation
+        building = RefreshGenerationFactory(week=dt.date(2018, 9, 27))
+        publishGeneration(shown)
+
+        pruneGenerations()
+
+        assert set(refreshGeneration.objects.all()) == {shown, recent, building}
+        assert not spotifyAlbum.objects.filter(generation=old).exists()
+
+
+@pytest.mark.parametrize("current, expected", [
+    (dt.datetime(2018, 9, 20, 21, 15), dt.datetime(2018, 9, 20, 21, 15)),
+    (dt.datetime(2018, 9, 20, 21, 14), dt.datetime(2018, 9, 13, 21, 15)),
+    (dt.datetime(2018, 9, 24, 8, 0), dt.datetime(2018, 9, 20, 21, 15)),
+])
+def test_get_last_thursday(current, expected):
+    assert getLastThursday(current) == expected
+
+
+@pytest.mark.parametrize("created, expected", [
+    # Built on Thursday morning, the releases of that evening are still to come
+    (dt.datetime(2026, 10, 15, 10, 0), dt.datetime(2026, 10, 15, 21, 15)),
+    (dt.datetime(2026, 10, 15, 21, 15), dt.datetime(2026, 10, 22, 21, 15)),
+    (dt.datetime(2026, 10, 18, 9, 0), dt.datetime(2026, 10, 22, 21, 15)),
+])
+def test_refresh_is_due_at_the_first_cutoff_after_the_build(created, expected):
+    generation = RefreshGenerationFactory()
+    generation.created = timezone.make_aware(created).astimezone(timezone.utc)
+
+    assert refreshDueAt(generation) == timezone.make_aware(expected)
+
+
+def test_group_releases_uses_one_query(django_assert_num_queries):
+    generation = RefreshGenerationFactory()
+    older = SpotifyAlbumFactory(generation=generation, album_type="album",
+                                release=dt.datetime(2018, 8, 3, tzinfo=timezone.utc))
+    newer = SpotifyAlbumFactory(generation=generation, album_type="album",
+                                release=dt.datetime(2018, 9, 7, tzinfo=timezone.utc))
+    single = SpotifyAlbumFactory(generation=generation, album_type="single")
+
+    with django_assert_num_queries(1):
+        releases = groupReleases(generation.albums.all())
+
+    assert releases == {"album": [newer, older], "single": [single]}
+
+
+def test_migrated_rows_are_adopted_into_their_thursday_week():
+    migration = importlib.import_module("trendingAlbums.migrations.0004_refresh_generations")
+    album = SpotifyAlbumFactory(generation=None)
+    # A refresh on Monday belongs to the week of the Thursday before
+    created = dt.datetime(2018, 9, 24, 20, 0, tzinfo=timezone.utc)
+    spotifyAlbum.objects.filter(pk=album.pk).update(created=created)
+
+    migration.adopt_existing_rows(apps, None)
+
+    adopted = refreshState.objects.get().current
+    assert adopted.week == getLastThursday(utc_to_local(created)).date() == dt.date(2018, 9, 20)
+    assert adopted.albums.get() == album
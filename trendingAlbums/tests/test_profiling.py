@@ -0,0 +1,62 @@
+import pytest
+from django.urls import reverse
+
+from trendingAlbums.models import publishGeneration
+from trendingAlbums.tests.factories import SpotifyAlbumFactory
+from weekly_drop.users.tests.factories import UserFactory
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def profiling(settings, tmpdir):
+    settings.PROFILING_ENABLED = True
+    settings.PROFILING_SAMPLE_RATE = 1000
+    settings.PROFILING_SLOW_MS = 10000
+    settings.PROFILING_DUMP_DIR = str(tmpdir)
+    return settings
+
+
+def timing(response):
+    return dict(part.split(";")[:2] for part in response["Server-Timing"].split(", "))
+
+
+def test_header_triggers_profile(client, profiling):
+    publishGeneration(SpotifyAlbumFactory().generation)
+
+    assert "Server-Timing" not in client.get(reverse("home"))
+
+    response = client.get(reverse("home"), HTTP_X_PROFILE="1")
+
+    assert 'desc="' in response["Server-Timing"]
+    assert set(timing(response)) == {"total", "view", "render", "db"}
+    # The releases are queried lazily while the template renders
+    assert float(timing(response)["render"][4:]) > 0
+
+
+def test_requests_are_sampled(client, profiling):
+    profiling.PROFILING_SAMPLE_RATE = 2
+
+    responses = [client.get(reverse("home")) for _ in range(4)]
+
+    assert ["Server-Timing" in response for response in responses] == [False, True, False, True]
+
+
+def test_only_configured_views_are_profiled(client, profiling):
+    profiling.PROFILING_VIEWS = ["users:*"]
+    client.force_login(UserFactory())
+
+    assert "Server-Timing" not in client.get(reverse("home"), HTTP_X_PROFILE="1")
+    assert "Server-Timing" in client.get(reverse("users:list"), HTTP_X_PROFILE="1")
+
+
+def test_slow_requests_are_dumped(client, profiling, tmpdir):
+    profiling.PROFILING_SLOW_MS = 0
+
+    client.get(reverse("home"), HTTP_X_PROFILE="1")
+
+    assert [path.ext for path in tmpdir.listdir()] == [".prof"]
+
+
+def test_disabled_by_default(client):
+    assert "Server-Timing" not in client.get(reverse("home"), HTTP_X_PROFILE="1")
@@ -0,0 +1,151 @@
+import datetime as dt
+from unittest import mock
+
+import pytest
+
+from django.utils import timezone
+
+from trendingAlbums.models import crawlCheckpoint
+from trendingAlbums.reddit import (
+    filterFreshOnly, generationPosts, getRedditObjects, getRedditPages, redditRecord, toRedditRecord
+)
+from trendingAlbums.tests.factories import RedditPostFactory, RefreshGenerationFactory
+
+pytestmark = pytest.mark.django_db
+
+
+def record(title, post_id="abc"):
+    return redditRecord(title=title, score=10, id=post_id, url="https://reddit.com/" + post_id,
+                        comms_num=3, timestamp=dt.datetime(2018, 9, 21, 12, 0))
+
+
+def test_filter_fresh_only_streams():
+    records = iter([record("[FRESH] Drake - Nice For What"), record("[DISCUSSION] Best verse?")])
+
+    fresh = filterFreshOnly(records)
+
+    assert next(fresh).title == "[FRESH] Drake - Nice For What"
+    assert list(fresh) == []
+
+
+def test_to_reddit_record():
+    submission = mock.Mock(title="[FRESH ALBUM] Mac Miller - Swimming", score=5000, id="8xyz",
+                           url="https://open.spotify.com/album/1", num_comments=900, created=1533859200)
+
+    parsed = toRedditRecord(submission)
+
+    assert parsed.title == "[FRESH ALBUM] Mac Miller - Swimming"
+    assert parsed.comms_num == 900
+    assert parsed.timestamp == dt.datetime.fromtimestamp(1533859200)
+
+
+def test_get_reddit_objects_builds_fresh_posts():
+    generation = RefreshGenerationFactory()
+    records = [record("[FRESH EP] Saba - Care For Me", "a"), record("[META] Rules", "b")]
+
+    with mock.patch("trendingAlbums.reddit.getRedditPages", return_value=iter([records])):
+        saved = getRedditObjects(generation)
+
+    assert saved == 1
+    assert [(post.post_id, post.generation) for post in generation.posts.all()] == [("a", generation)]
+
+
+def test_duplicate_posts_are_kept_once():
+    generation = RefreshGenerationFactory()
+    records = [record("[FRESH] Drake - Nice For What", "a"), record("[FRESH] Drake - Nice For What", "a")]
+
+    with mock.patch("trendingAlbums.reddit.getRedditPages", return_value=iter([records])):
+        getRedditObjects(generation)
+
+    assert generation.posts.count() == 1
+
+
+def test_generation_posts_are_read_in_chunks(django_assert_num_queries):
+    generation = RefreshGenerationFactory()
+    posts = RedditPostFactory.create_batch(5, generation=generation)
+    RedditPostFactory()
+
+    with django_assert_num_queries(4):
+        chunks = list(generationPosts(generation, 2))
+
+    assert [[post.pk for post in chunk] for chunk in chunks] == [[post.pk for post in posts[:2]],
+                                                                 [post.pk for post in posts[2:4]], [posts[4].pk]]
+
+
+class FakeListing:
+    """
+    Pages through submissions like a praw listing, one page per call
+    """
+
+    def __init__(self, submissions):
+        self.submissions = submissions
+        self.calls = []
+
+    def __call__(self, *args, limit, params, **kwargs):
+        self.calls.append(params.get("after"))
+        fullnames = [submission.fullname for submission in self.submissions]
+        start = fullnames.index(params["after"]) + 1 if params.get("after") else 0
+        return iter(self.submissions[start:start + limit])
+
+
+def submission(n, age=dt.timedelta(hours=1)):
+    return mock.Mock(title="[FRESH] Artist {0} - Single".format(n), score=1, id=str(n), fullname="t3_{0}".format(n),
+                     url="https://reddit.com/" + str(n), num_comments=0,
+                     created=1533859200, created_utc=(timezone.now() - age).timestamp())
+
+
+class TestRedditCrawl:
+
+    @pytest.fixture(autouse=True)
+    def crawl_settings(self, settings):
+        settings.REDDIT_CRAWL_LISTINGS = ["new"]
+        settings.REDDIT_CRAWL_PAGE_SIZE = 2
+        settings.REDDIT_CRAWL_MAX_PAGES = 10
+        settings.REDDIT_CRAWL_WINDOW_DAYS = 7
+
+    def test_pages_until_release_window_is_covered(self):
+        old = dt.timedelta(days=8)
+        subreddit = mock.Mock(new=FakeListing([submission(1), submission(2), submission(3), submission(4, old),
+                                               submission(5, old), submission(6, old), submission(7, old)]))
+
+        pages = list(getRedditPages(RefreshGenerationFactory(), subreddit))
+
+        assert [[record.id for record in page] for page in pages] == [["1", "2"], ["3"], []]
+        assert subreddit.new.calls == [None, "t3_2", "t3_4"]
+
+    def test_stops_after_max_pages(self, settings):
+        settings.REDDIT_CRAWL_MAX_PAGES = 2
+        subreddit = mock.Mock(new=FakeListing([submission(n) for n in range(10)]))
+
+        pages = list(getRedditPages(RefreshGenerationFactory(), subreddit))
+
+        assert len(pages) == 2
+
+    def test_restarted_crawl_continues_after_checkpoint(self):
+        generation = RefreshGenerationFactory()
+        subreddit = mock.Mock(new=FakeListing([submission(n) for n in range(5)]))
+
+        pages = getRedditPages(generation, subreddit)
+        next(pages)
+        next(pages)
+        pages.close()
+        # The second page was never confirmed by asking for the next one
+        assert crawlCheckpoint.objects.get(generation=generation).after == "t3_1"
+
+        subreddit.new.calls.clear()
+        resumed = list(getRedditPages(generation, subreddit))
+
+        assert [[record.id for record in page] for page in resumed] == [["2", "3"], ["4"]]
+        assert crawlCheckpoint.objects.get(generation=generation).done
+        assert list(getRedditPages(generation, subreddit)) == []
+
+    def test_overlapping_pages_are_saved_once(self):
+        generation = RefreshGenerationFactory()
+        pages = [[record("[FRESH] Drake - Nice For What", "a")],
+                 [record("[FRESH] Drake - Nice For What", "a"), record("[FRESH] Saba - Busy", "b")]]
+
+        with mock.patch("trendingAlbums.reddit.getRedditPages", return_value=iter(pages)):
+            saved = getRedditObjects(generation)
+
+        assert saved == 2
+        assert list(generation.posts.order_by("pk").values_list("post_id", flat=True)) == ["a", "b"]
@@ -0,0 +1,242 @@
+import datetime as dt
+from unittest import mock
+
+import pytest
+import requests
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from trendingAlbums.locks import LockLost
+from trendingAlbums.metrics import metrics
+from trendingAlbums.models import (
+    currentAlbums, currentGeneration, publishGeneration, redditPost, refreshGeneration, spotifyAlbum
+)
+from trendingAlbums.reddit import redditRecord
+from trendingAlbums.releases import getDateTime, getSpotifyAlbums, isRecentRelease, resolveSpotifyAlbums
+from trendingAlbums.tests.factories import RedditPostFactory, RefreshGenerationFactory, SpotifyAlbumFactory
+
+pytestmark = pytest.mark.django_db
+
+
+def record(title, post_id="abc"):
+    return redditRecord(title=title, score=10, id=post_id, url="https://reddit.com/" + post_id,
+                        comms_num=3, timestamp=dt.datetime(2018, 9, 21, 12, 0))
+
+
+@pytest.mark.parametrize("release, expected", [
+    ("2018-08-03", dt.date(2018, 8, 3)),
+    ("2018-08", dt.date(2018, 8, 1)),
+    ("2018", dt.date(2018, 1, 1)),
+])
+def test_get_date_time(release, expected):
+    assert getDateTime(release) == expected
+
+
+def test_get_spotify_albums_inserts_in_batches(settings):
+    settings.INGESTION_BATCH_SIZE = 2
+    records = [record("[FRESH] Artist - Single {0}".format(n), str(n)) for n in range(5)]
+
+    with mock.patch("trendingAlbums.reddit.getRedditPages", return_value=iter([records])), \
+            mock.patch("trendingAlbums.releases.resolveSpotifyAlbums", side_effect=lambda posts: [None] * len(posts)), \
+            CaptureQueriesContext(connection) as queries:
+        getSpotifyAlbums()
+
+    inserts = [query for query in queries if query["sql"].startswith('INSERT INTO "trendingAlbums_redditpost"')]
+    assert len(inserts) == 3
+    assert redditPost.objects.count() == 5
+
+
+def test_get_spotify_albums_publishes_new_generation():
+    old = SpotifyAlbumFactory()
+    publishGeneration(old.generation)
+    # hit and again point at the same release, miss is not on Spotify
+    posts = []
+
+    def fetch(generation, heartbeat):
+        posts.extend(RedditPostFactory.create_batch(3, generation=generation))
+        return len(posts)
+
+    def resolve(post):
+        if post.pk == posts[-1].pk:
+            return None
+        return SpotifyAlbumFactory.build(generation_id=post.generation_id, uri="spotify:album:new")
+
+    with mock.patch("trendingAlbums.releases.getRedditObjects", side_effect=fetch), \
+            mock.patch("trendingAlbums.releases.resolveSpotifyAlbums",
+                       side_effect=lambda posts: list(map(resolve, posts))):
+        generation = getSpotifyAlbums()
+
+    assert currentGeneration() == generation
+    assert list(currentAlbums().values_list("uri", flat=True)) == ["spotify:album:new"]
+    # The previous generation is kept until it is pruned
+    assert spotifyAlbum.objects.filter(pk=old.pk).exists()
+
+
+def test_get_spotify_albums_matches_in_chunks(settings):
+    settings.INGESTION_BATCH_SIZE = 2
+    records = [record("[FRESH] Artist - Single {0}".format(n), str(n)) for n in range(5)]
+
+    def resolve(posts):
+        return [SpotifyAlbumFactory.build(generation_id=post.generation_id, uri="spotify:album:" + post.post_id)
+                for post in posts]
+
+    with mock.patch("trendingAlbums.reddit.getRedditPages", return_value=iter([records])), \
+            mock.patch("trendingAlbums.releases.resolveSpotifyAlbums", side_effect=resolve) as resolver:
+        generation = getSpotifyAlbums()
+
+    assert [len(call[0][0]) for call in resolver.call_args_list] == [2, 2, 1]
+    assert generation.albums.count() == 5
+
+
+def test_get_spotify_albums_stops_when_the_heartbeat_fails(settings):
+    settings.INGESTION_BATCH_SIZE = 2
+    records = [record("[FRESH] Artist - Single {0}".format(n), str(n)) for n in range(5)]
+    # The crawl's page and the first chunk are saved, then the lock is lost
+    heartbeat = mock.Mock(side_effect=[None, None, LockLost()])
+
+    with mock.patch("trendingAlbums.reddit.getRedditPages", return_value=iter([records])), \
+            mock.patch("trendingAlbums.releases.resolveSpotifyAlbums", side_effect=lambda posts: [None] * len(posts)), \
+            mock.patch("trendingAlbums.releases.saveMatches") as save, \
+            pytest.raises(LockLost):
+        getSpotifyAlbums(heartbeat)
+
+    assert save.call_count == 1
+    assert currentGeneration() is None
+
+
+class TestIncrementalRefresh:
+
+    def refresh(self, records, resolve):
+        with mock.patch("trendingAlbums.reddit.getRedditPages", return_value=iter([records])), \
+                mock.patch("trendingAlbums.releases.resolveSpotifyAlbums",
+                           side_effect=lambda posts: list(map(resolve, posts))) as resolver:
+            generation = getSpotifyAlbums()
+        return generation, [post.post_id for call in resolver.call_args_list for post in call[0][0]]
+
+    def resolve(self, post):
+        return SpotifyAlbumFactory.build(generation_id=post.generation_id, uri="spotify:album:" + post.post_id)
+
+    def test_matched_posts_are_not_resolved_again(self):
+        first, resolved = self.refresh([record("[FRESH] Drake - Nice For What", "a")], self.resolve)
+        assert resolved == ["a"]
+
+        second, resolved = self.refresh([record("[FRESH] Drake - Nice For What", "a"),
+                                         record("[FRESH] Saba - Busy", "b")], self.resolve)
+
+        assert resolved == ["b"]
+        assert set(second.albums.values_list("uri", flat=True)) == {"spotify:album:a", "spotify:album:b"}
+        assert first.albums.get().pk != second.albums.get(uri="spotify:album:a").pk
+        assert second.posts.get(post_id="a").album_uri == "spotify:album:a"
+
+    def test_retitled_and_unmatched_posts_are_resolved_again(self):
+        self.refresh([record("[FRESH] Drake - Nice For What", "a"), record("[FRESH] Saba - Busy", "b")],
+                     lambda post: self.resolve(post) if post.post_id == "a" else None)
+
+        _, resolved = self.refresh([record("[FRESH] Drake - Nice For What (Remix)", "a"),
+                                    record("[FRESH] Saba - Busy", "b")], self.resolve)
+
+        assert sorted(resolved) == ["a", "b"]
+
+
+def test_interrupted_refresh_is_resumed():
+    def crawl(generation):
+        yield [record("[FRESH] Drake - Nice For What", "a")]
+        raise RuntimeError("reddit went away")
+
+    with mock.patch("trendingAlbums.reddit.getRedditPages", side_effect=crawl), pytest.raises(RuntimeError):
+        getSpotifyAlbums()
+    unpublished = refreshGeneration.objects.get()
+
+    with mock.patch("trendingAlbums.reddit.getRedditPages", return_value=iter([])), \
+            mock.patch("trendingAlbums.releases.resolveSpotifyAlbums", side_effect=lambda posts: [None] * len(posts)):
+        generation = getSpotifyAlbums()
+
+    assert generation == unpublished == currentGeneration()
+    assert list(generation.posts.values_list("post_id", flat=True)) == ["a"]
+
+
+def full_album(album_id, tracks=13):
+    return {"id": album_id, "uri": "spotify:album:" + album_id, "name": "Swimming", "album_type": "album",
+            "release_date": "2018-08-03", "tracks": {"total": tracks},
+            "images": [{"url": "https://i.scdn.co/640"}, {"url": "https://i.scdn.co/300"}]}
+
+
+class TestResolveSpotifyAlbums:
+
+    @pytest.fixture
+    def spotify(self):
+        spotify = mock.Mock()
+        spotify.search.side_effect = lambda q, type: {"artists": {"total": 1, "items": [{"id": q[7:]}]}}
+        released = timezone.localdate().isoformat()
+        # An older release with the same title is listed before the new one
+        spotify.artist_albums.side_effect = lambda artist_id, album_type: {"items": [
+            {"id": artist_id + " 0", "name": "Swimming", "release_date": "2016-09-16"},
+            {"id": artist_id + " 1", "name": "Small Worlds", "release_date": released},
+            {"id": artist_id + " 2", "name": "Swimming", "release_date": released}]}
+        spotify.albums.side_effect = lambda ids: {"albums": [full_album(album_id) for album_id in ids]}
+        with mock.patch("trendingAlbums.releases.getSpotifyClient", return_value=spotify):
+            yield spotify
+
+    def test_best_matches_are_fetched_in_one_batch(self, spotify):
+        generation = RefreshGenerationFactory()
+        posts = RedditPostFactory.build_batch(4, generation=generation)
+        titles = ["[FRESH ALBUM] Mac Miller - Swimming (Deluxe)", "[FRESH] Drake - Small Worlds ft. Future",
+                  "[FRESH] Saba - Busy", "[DISCUSSION] Swimming"]
+        for post, title in zip(posts, titles):
+            post.title = title
+
+        albums = resolveSpotifyAlbums(posts)
+
+        spotify.albums.assert_called_once_with(["Mac Miller 2", "Drake 1"])
+        assert [album.uri for album in albums[:2]] == ["spotify:album:Mac Miller 2", "spotify:album:Drake 1"]
+        assert albums[0].confidence == 1.0
+        assert albums[0].image_url == "https://i.scdn.co/300"
+        assert albums[0].generation_id == generation.pk
+        # No release of Saba is called Busy, and the last post is no release
+        assert albums[2:] == [None, None]
+
+    def test_older_release_with_the_same_title_is_rejected(self, spotify):
+        spotify.artist_albums.side_effect = lambda artist_id, album_type: {"items": [
+            {"id": artist_id + " 0", "name": "Swimming", "release_date": "2016-09-16"},
+            {"id": artist_id + " 1", "name": "Swimming", "release_date": "2018"}]}
+        post = RedditPostFactory.build(generation=RefreshGenerationFactory(),
+                                       title="[FRESH ALBUM] Mac Miller - Swimming")
+
+        assert resolveSpotifyAlbums([post]) == [None]
+        spotify.albums.assert_not_called()
+
+    def test_failing_post_does_not_abort_the_others(self, spotify):
+        search = spotify.search.side_effect
+
+        def flaky_search(q, type):
+            if q == "artist:Drake":
+                raise requests.exceptions.Timeout()
+            return search(q, type)
+
+        spotify.search.side_effect = flaky_search
+        generation = RefreshGenerationFactory()
+        posts = [RedditPostFactory.build(generation=generation, title=title) for title in
+                 ["[FRESH] Drake - Small Worlds", "[FRESH ALBUM] Mac Miller - Swimming"]]
+        metrics.reset()
+
+        albums = resolveSpotifyAlbums(posts)
+
+        assert albums[0] is None
+        assert albums[1].uri == "spotify:album:Mac Miller 2"
+        assert {(count["labels"]["outcome"], count["value"]) for count in metrics.snapshot()["counts"]
+                if count["name"] == "posts"} == {("error", 1), ("matched", 1)}
+
+
+@pytest.mark.parametrize("release_date, recent", [
+    ("2018-09-14", True),
+    ("2018-09-13", False),
+    ("2018-09", True),
+    ("2018-08", False),
+    ("2018", True),
+    ("0000", False),
+    ("", False),
+])
+def test_is_recent_release(release_date, recent):
+    assert isRecentRelease({"release_date": release_date}, dt.date(2018, 9, 14)) == recent
@@ -0,0 +1,58 @@
+import time
+from unittest import mock
+
+import pytest
+from django.utils import timezone
+
+from trendingAlbums.models import currentGeneration, redditPost, refreshGeneration
+from trendingAlbums.replay import Cassette, ReplayMiss, ReplaySpotify, replayRefresh
+
+pytestmark = pytest.mark.django_db
+
+
+def test_refresh_runs_offline_and_is_rolled_back():
+    timing = replayRefresh()
+
+    # In My Feelings and Bucket List Project came out before the release window
+    assert (timing.posts, timing.albums) == (5, 2)
+    assert timing.lookups["full_album"] == {"hits": 0, "misses": 2}
+    assert not refreshGeneration.objects.exists()
+    assert currentGeneration() is None
+
+
+def test_warm_replay_answers_from_the_lookup_cache():
+    replayRefresh()
+
+    timing = replayRefresh(cold=False)
+
+    assert timing.lookups["artist"] == {"hits": 5, "misses": 0}
+
+
+def test_replay_misses_are_reported(tmpdir):
+    spotify = ReplaySpotify(Cassette(str(tmpdir.join("spotify.json"))))
+
+    with pytest.raises(ReplayMiss):
+        spotify.search(q="artist:Saba", type="artist")
+
+
+def test_recorded_cassettes_replay_the_same_refresh(tmpdir):
+    live_subreddit = mock.Mock(**{"new.return_value": [], "search.return_value": []})
+    live_subreddit.hot.return_value = [mock.Mock(
+        title="[FRESH ALBUM] Mac Miller - Swimming", score=1, id="a", fullname="t3_a", url="https://reddit.com/a",
+        num_comments=0, created=time.time(), created_utc=time.time())]
+    album = {"id": "1", "uri": "spotify:album:1", "name": "Swimming", "album_type": "album",
+             "release_date": timezone.localdate().isoformat(), "images": [{"url": "https://i.scdn.co/640"}]}
+    live_spotify = mock.Mock(**{
+        "search.return_value": {"artists": {"total": 1, "items": [{"id": "mac"}]}},
+        "artist_albums.return_value": {"items": [album]},
+        "albums.return_value": {"albums": [dict(album, tracks={"total": 13})]},
+    })
+
+    with mock.patch("trendingAlbums.replay.buildSubreddit", return_value=live_subreddit), \
+            mock.patch("trendingAlbums.replay.buildSpotifyClient", return_value=live_spotify):
+        recorded = replayRefresh(record=True, cassette_dir=str(tmpdir))
+    replayed = replayRefresh(cassette_dir=str(tmpdir))
+
+    assert (recorded.posts, recorded.albums) == (replayed.posts, replayed.albums) == (1, 1)
+    assert sorted(path.basename for path in tmpdir.listdir()) == ["reddit.json", "spotify.json"]
+    assert not redditPost.objects.exists()
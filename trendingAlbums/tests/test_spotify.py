@@ -0,0 +1,117 @@
+import threading
+import time
+from unittest import mock
+
+import pytest
+import requests
+from spotipy.client import SpotifyException
+
+from trendingAlbums.spotify import (
+    ClientCredentials, RateLimitGate, Spotify, getSpotifyClient, resetSpotifyClient, resolveConcurrently
+)
+
+
+class TestSpotify:
+
+    def test_retries_rate_limited_requests(self, settings):
+        settings.SPOTIFY_MAX_RETRIES = 2
+        spotify = Spotify()
+        limited = SpotifyException(429, -1, "rate limited", headers={"Retry-After": "3"})
+
+        with mock.patch.object(spotify, "_internal_call", side_effect=[limited, {"ok": True}]), \
+                mock.patch("trendingAlbums.spotify.rateLimit") as gate:
+            assert spotify.search(q="artist:Drake", type="artist") == {"ok": True}
+
+        gate.pause.assert_called_once_with(3)
+
+    def test_gives_up_after_max_retries(self, settings):
+        settings.SPOTIFY_MAX_RETRIES = 1
+        spotify = Spotify()
+        failure = SpotifyException(502, -1, "bad gateway")
+
+        with mock.patch.object(spotify, "_internal_call", side_effect=failure) as call, \
+                mock.patch("trendingAlbums.spotify.time.sleep"), \
+                pytest.raises(SpotifyException):
+            spotify.search(q="artist:Drake", type="artist")
+
+        assert call.call_count == 2
+
+    def test_retries_timeouts(self, settings):
+        settings.SPOTIFY_MAX_RETRIES = 2
+        spotify = Spotify()
+
+        with mock.patch.object(spotify, "_internal_call", side_effect=[
+                requests.exceptions.Timeout(), requests.exceptions.ConnectionError(), {"ok": True}]) as call, \
+                mock.patch("trendingAlbums.spotify.time.sleep"):
+            assert spotify.search(q="artist:Drake", type="artist") == {"ok": True}
+
+        assert call.call_count == 3
+
+    def test_gives_up_on_timeouts_after_max_retries(self, settings):
+        settings.SPOTIFY_MAX_RETRIES = 1
+        spotify = Spotify()
+
+        with mock.patch.object(spotify, "_internal_call", side_effect=requests.exceptions.Timeout()) as call, \
+                mock.patch("trendingAlbums.spotify.time.sleep"), \
+                pytest.raises(requests.exceptions.Timeout):
+            spotify.search(q="artist:Drake", type="artist")
+
+        assert call.call_count == 2
+
+    def test_does_not_retry_client_errors(self):
+        spotify = Spotify()
+        failure = SpotifyException(404, -1, "not found")
+
+        with mock.patch.object(spotify, "_internal_call", side_effect=failure) as call, \
+                pytest.raises(SpotifyException):
+            spotify.artist_albums("spotify:artist:1")
+
+        assert call.call_count == 1
+
+
+def test_gate_waits_for_pause():
+    gate = RateLimitGate()
+    gate.pause(0.05)
+    start = time.monotonic()
+
+    gate.wait()
+
+    assert time.monotonic() - start >= 0.04
+
+
+def test_resolve_concurrently_overlaps_calls():
+    barrier = threading.Barrier(4, timeout=5)
+
+    def resolve(item):
+        # Only returns if all four calls are in flight at the same time
+        barrier.wait()
+        return item * 2
+
+    assert resolveConcurrently(resolve, [1, 2, 3, 4], workers=4) == [2, 4, 6, 8]
+
+
+class TestSpotifyClient:
+
+    def teardown_method(self):
+        resetSpotifyClient()
+
+    def test_client_is_shared(self):
+        assert getSpotifyClient() is getSpotifyClient()
+
+    def test_client_keeps_connections_alive(self):
+        adapter = getSpotifyClient()._session.get_adapter("https://api.spotify.com/v1/")
+        pool = adapter.poolmanager
+
+        adapter.close()
+
+        assert adapter.poolmanager is pool
+
+    def test_token_is_requested_once(self):
+        credentials = ClientCredentials(client_id="id", client_secret="secret")
+        token = {"access_token": "token", "expires_in": 3600}
+
+        with mock.patch.object(credentials, "_request_access_token", return_value=token) as request:
+            assert credentials.get_access_token() == "token"
+            assert credentials.get_access_token() == "token"
+
+        request.assert_called_once_with()
@@ -0,0 +1,96 @@
+import datetime as dt
+import queue
+import threading
+from unittest import mock
+
+import pytest
+
+from trendingAlbums.models import publishGeneration
+from trendingAlbums.reddit import redditRecord
+from trendingAlbums.releases import addStreamedPosts
+from trendingAlbums.streaming import runStream, streamFreshPosts, takeBatch
+from trendingAlbums.tests.factories import RefreshGenerationFactory, SpotifyAlbumFactory
+
+
+def record(title, post_id):
+    return redditRecord(title=title, score=1, id=post_id, url="https://reddit.com/" + post_id,
+                        comms_num=0, timestamp=dt.datetime(2018, 9, 21, 12, 0))
+
+
+def submission(title, post_id):
+    return mock.Mock(title=title, score=1, id=post_id, url="https://reddit.com/" + post_id,
+                     num_comments=0, created=1533859200)
+
+
+def subreddit(*submissions):
+    return mock.Mock(**{"stream.submissions.return_value": iter(submissions)})
+
+
+def test_only_fresh_posts_are_queued(settings):
+    settings.REDDIT_STREAM_PAUSE = 0
+    posts = queue.Queue()
+
+    streamFreshPosts(subreddit(submission("[FRESH] Saba - Busy", "a"), None,
+                               submission("[DISCUSSION] Best verse?", "b")), posts, threading.Event())
+
+    assert [posts.get_nowait().id] == ["a"]
+    assert posts.empty()
+
+
+def test_full_queue_blocks_the_stream():
+    posts = queue.Queue(maxsize=1)
+    stop = threading.Event()
+    listener = threading.Thread(target=streamFreshPosts, args=(
+        subreddit(submission("[FRESH] Saba - Busy", "a"), submission("[FRESH] Saba - Heaven", "b")), posts, stop))
+    listener.start()
+
+    assert posts.get(timeout=1).id == "a"
+    assert posts.get(timeout=1).id == "b"
+    listener.join(timeout=1)
+    assert not listener.is_alive()
+
+
+def test_take_batch_stops_at_batch_size():
+    posts = queue.Queue()
+    for n in range(5):
+        posts.put(n)
+
+    assert takeBatch(posts, 3, 0.1) == [0, 1, 2]
+    assert takeBatch(posts, 3, 0.1) == [3, 4]
+    assert takeBatch(posts, 3, 0.1) == []
+
+
+@pytest.mark.django_db
+class TestAddStreamedPosts:
+
+    def resolve(self, post):
+        return SpotifyAlbumFactory.build(generation_id=post.generation_id, uri="spotify:album:" + post.post_id)
+
+    def test_nothing_is_added_before_the_first_refresh(self):
+        assert addStreamedPosts([record("[FRESH] Saba - Busy", "a")]) == 0
+
+    def test_releases_are_added_to_the_shown_generation(self):
+        generation = RefreshGenerationFactory()
+        publishGeneration(generation)
+        version = generation.version
+
+        with mock.patch("trendingAlbums.releases.resolveSpotifyAlbums",
+                        side_effect=lambda posts: list(map(self.resolve, posts))):
+            added = addStreamedPosts([record("[FRESH] Saba - Busy", "a")])
+            # The same post coming in twice is only resolved once
+            again = addStreamedPosts([record("[FRESH] Saba - Busy", "a")])
+
+        generation.refresh_from_db()
+        assert (added, again) == (1, 0)
+        assert list(generation.albums.values_list("uri", flat=True)) == ["spotify:album:a"]
+        assert generation.posts.get().album_uri == "spotify:album:a"
+        assert generation.version != version
+
+    def test_run_stream_resolves_batches(self, settings):
+        settings.REDDIT_STREAM_BATCH_WAIT = 0.1
+        publishGeneration(RefreshGenerationFactory())
+
+        with mock.patch("trendingAlbums.streaming.addStreamedPosts", return_value=1) as add:
+            runStream(subreddit(submission("[FRESH] Saba - Busy", "a"), submission("[FRESH] Saba - Heaven", "b")))
+
+        assert [post.id for batch in add.call_args_list for post in batch[0][0]] == ["a", "b"]
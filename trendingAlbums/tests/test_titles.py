@@ -0,0 +1,29 @@
+import pytest
+
+from trendingAlbums.titles import freshTitle, parseTitle
+
+
+@pytest.mark.parametrize("title, expected", [
+    ("[FRESH] Drake - Nice For What", freshTitle("fresh", "Drake", "Nice For What", "single")),
+    ("[FRESH EP] Saba - Care For Me", freshTitle("ep", "Saba", "Care For Me", "single")),
+    ("[FRESH ALBUM] Mac Miller - Swimming", freshTitle("album", "Mac Miller", "Swimming", "album")),
+    ("[Fresh Video] JID - 151 Rum", freshTitle("video", "JID", "151 Rum", "single")),
+    ("[FRESH MIXTAPE] Valee - GOOD Job, You Found Me",
+     freshTitle("mixtape", "Valee", "GOOD Job, You Found Me", "album")),
+    ("  [ fresh  album ]  Jay-Z  -  4:44 ", freshTitle("album", "Jay-Z", "4:44", "album")),
+    ("[FRESH] Pusha T – If You Know You Know", freshTitle("fresh", "Pusha T", "If You Know You Know", "single")),
+    ("[FRESH] Kanye West - Ye - Tracklist", freshTitle("fresh", "Kanye West", "Ye - Tracklist", "single")),
+    ("[FRESH] Travis Scott drops tomorrow", freshTitle("fresh", None, None, "single")),
+])
+def test_parses_fresh_titles(title, expected):
+    assert parseTitle(title) == expected
+
+
+@pytest.mark.parametrize("title", [
+    "[DISCUSSION] Kids See Ghosts",
+    "[FRESHMAN] XXL 2018 list",
+    "Daily Discussion Thread 09/21/2018",
+    "Mac Miller - Swimming [FRESH ALBUM]",
+])
+def test_other_posts_are_not_fresh(title):
+    assert parseTitle(title) is None
@@ -0,0 +1,132 @@
+import os
+import subprocess
+import sys
+from unittest import mock
+
+import pytest
+from django.urls import reverse
+
+from trendingAlbums.models import publishGeneration
+from trendingAlbums.tests.factories import RefreshGenerationFactory, SpotifyAlbumFactory
+from weekly_drop.users.tests.factories import UserFactory
+
+pytestmark = pytest.mark.django_db
+
+
+class TestAlbumView:
+
+    def test_lists_albums_and_singles(self, client):
+        generation = RefreshGenerationFactory()
+        album = SpotifyAlbumFactory(generation=generation, album_type="album")
+        single = SpotifyAlbumFactory(generation=generation, album_type="single")
+        SpotifyAlbumFactory(album_type="album")
+        publishGeneration(generation)
+
+        response = client.get(reverse("home"))
+
+        assert response.status_code == 200
+        assert list(response.context["albums"]) == [album]
+        assert list(response.context["singles"]) == [single]
+
+    def test_does_not_refresh_on_request(self, client):
+        with mock.patch("trendingAlbums.ingestion.getSpotifyAlbums") as refresh:
+            response = client.get(reverse("home"))
+
+        assert response.status_code == 200
+        refresh.assert_not_called()
+
+    def test_release_lists_are_cached_per_generation(self, client, django_assert_num_queries):
+        generation = RefreshGenerationFactory()
+        SpotifyAlbumFactory(generation=generation, name="Astroworld")
+        publishGeneration(generation)
+        client.get(reverse("home"))
+
+        # Only the ATOMIC_REQUESTS savepoint is left, the refresh state and
+        # the lists come from the cache
+        with django_assert_num_queries(2):
+            response = client.get(reverse("home"))
+        assert b"Astroworld" in response.content
+
+        newer = RefreshGenerationFactory()
+        SpotifyAlbumFactory(generation=newer, name="Swimming")
+        publishGeneration(newer)
+
+        response = client.get(reverse("home"))
+        assert b"Swimming" in response.content
+        assert b"Astroworld" not in response.content
+
+
+class TestConditionalGet:
+
+    def test_not_modified_with_matching_etag(self, client):
+        publishGeneration(RefreshGenerationFactory())
+        response = client.get(reverse("home"))
+        assert response.has_header("ETag")
+        assert response.has_header("Last-Modified")
+
+        with mock.patch("trendingAlbums.views.AlbumView.get_context_data") as render:
+            cached = client.get(reverse("home"), HTTP_IF_NONE_MATCH=response["ETag"])
+
+        assert cached.status_code == 304
+        render.assert_not_called()
+
+    def test_etag_changes_with_generation(self, client):
+        publishGeneration(RefreshGenerationFactory())
+        etag = client.get(reverse("home"))["ETag"]
+
+        publishGeneration(RefreshGenerationFactory())
+
+        assert client.get(reverse("home"), HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+    def test_anonymous_page_is_public_until_cutoff(self, client):
+        publishGeneration(RefreshGenerationFactory())
+
+        response = client.get(reverse("home"))
+
+        assert "public" in response["Cache-Control"]
+        max_age = int(response["Cache-Control"].split("max-age=")[1].split(",")[0])
+        assert 0 < max_age <= 7 * 24 * 60 * 60
+        assert "Cookie" in response["Vary"]
+
+    def test_logged_in_page_is_private(self, client):
+        client.force_login(UserFactory())
+
+        response = client.get(reverse("home"))
+
+        assert "private" in response["Cache-Control"]
+
+    def test_page_with_a_message_is_not_cached(self, client):
+        publishGeneration(RefreshGenerationFactory())
+        client.force_login(UserFactory())
+        client.post(reverse("account_logout"))
+
+        response = client.get(reverse("home"))
+
+        assert b"You have signed out." in response.content
+        assert "public" not in response["Cache-Control"]
+        assert "no-cache" in response["Cache-Control"]
+        assert not response.has_header("ETag")
+        assert not response.has_header("Last-Modified")
+
+    def test_message_is_not_swallowed_by_if_modified_since(self, client):
+        publishGeneration(RefreshGenerationFactory())
+        last_modified = client.get(reverse("home"))["Last-Modified"]
+        client.force_login(UserFactory())
+        client.post(reverse("account_logout"))
+
+        response = client.get(reverse("home"), HTTP_IF_MODIFIED_SINCE=last_modified)
+
+        assert response.status_code == 200
+        assert b"You have signed out." in response.content
+
+
+def test_web_workers_do_not_import_api_clients():
+    boot = ("import sys, config.wsgi\n"
+            "from django.urls import get_resolver\n"
+            "get_resolver().url_patterns\n"
+            "print(' '.join(module for module in ('praw', 'spotipy') if module in sys.modules))")
+
+    loaded = subprocess.check_output([sys.executable, "-c", boot], universal_newlines=True,
+                                     env=dict(os.environ, DJANGO_SETTINGS_MODULE="config.settings.test"))
+
+    assert loaded.strip() == ""
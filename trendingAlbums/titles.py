@@ -0,0 +1,46 @@
+'''
+Parsing of the FRESH tags r/hiphopheads puts in front of new releases, e.g.
+``[FRESH ALBUM] Mac Miller - Swimming``.
+'''
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+# A parsed release post. tag is the lower case kind of the FRESH tag ('fresh'
+# for a plain [FRESH]), artist and title are None when the title does not
+# have the "Artist - Title" form.
+freshTitle = namedtuple('freshTitle', ['tag', 'artist', 'title', 'album_type'])
+
+# The Spotify album_type every tag is looked up as
+TAG_ALBUM_TYPES = {
+    'fresh': 'single',
+    'ep': 'single',
+    'video': 'single',
+    'album': 'album',
+    'mixtape': 'album',
+}
+
+FRESH_TITLE = re.compile(
+    r'\s*\[\s*fresh(?:\s+(?P<tag>ep|album|video|mixtape))?\s*\]\s*'
+    r'(?:(?P<artist>.+?)\s+[-–—]\s+(?P<title>.*\S))?',
+    re.IGNORECASE | re.DOTALL)
+
+
+@lru_cache(maxsize=4096)
+def parseTitle(title):
+    '''
+    Parses the tag, artist and release title of a post in a single pass. The
+        result is cached, so filtering and resolving a post parse its title
+        only once.
+
+    :param title (string): title of the reddit post
+    :return (freshTitle): The parsed title, None if the post is not about a
+        new release
+    '''
+    match = FRESH_TITLE.match(title)
+    if match is None:
+        return None
+
+    tag = (match.group('tag') or 'fresh').lower()
+    return freshTitle(tag=tag, artist=match.group('artist'), title=match.group('title'),
+                      album_type=TAG_ALBUM_TYPES[tag])
@@ -1,7 +1,11 @@
 from django.urls import path
-from .views import AlbumView
+from .api import albumList, postList
+from .views import AlbumView, metricsView
 
 
 urlpatterns = [
     path("", AlbumView.as_view(template_name="pages/home.html"), name="home"),
+    path("metrics/", metricsView, name="metrics"),
+    path("api/albums/", albumList, name="api-albums"),
+    path("api/posts/", postList, name="api-posts"),
 ]
@@ -1,23 +1,53 @@
-from django.utils import timezone
+from django.conf import settings
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+from django.utils.decorators import method_decorator
+from django.utils.functional import SimpleLazyObject
+from django.views.decorators.cache import never_cache
 from django.views.generic.list import ListView
 
-from .models import getSpotifyAlbums, spotifyAlbum, readyToUpdate
+from .caching import cacheReleases, requestGeneration
+from .metrics import lastMetrics, renderPrometheus
+from .models import groupReleases, spotifyAlbum
 
+@method_decorator(cacheReleases, name='dispatch')
 class AlbumView(ListView):
 
     model = spotifyAlbum
 
+    def get_queryset(self):
+        self.generation = requestGeneration(self.request)
+        if self.generation is None:
+            return spotifyAlbum.objects.none()
+        return spotifyAlbum.objects.filter(generation=self.generation)
+
     def get_context_data(self, **kwargs):
         '''
-        Edit the context data by having two different querysets
-            for albums and singles. Before we check if the new
-            releases are ready for the week and get the new
-            Spotify releases.
+        Edit the context data by having two different lists for
+            albums and singles of the generation that is shown, both
+            fetched in one query. The releases themselves are refreshed
+            by the ingestion worker, the view only reads them. The
+            rendered lists are cached per generation version, the query
+            is lazy and only runs when that cache is empty.
         '''
-        if readyToUpdate():
-            getSpotifyAlbums()
         context_data = super(AlbumView, self).get_context_data(**kwargs)
-        context_data['singles'] = spotifyAlbum.objects.filter(album_type='single')
-        context_data['albums'] = spotifyAlbum.objects.filter(album_type='album')
+        releases = SimpleLazyObject(lambda: groupReleases(self.object_list))
+        context_data['singles'] = SimpleLazyObject(lambda: releases['single'])
+        context_data['albums'] = SimpleLazyObject(lambda: releases['album'])
+        context_data['releases_version'] = self.generation.version if self.generation is not None else 'none'
+        context_data['releases_cache_timeout'] = settings.HOMEPAGE_CACHE_TIMEOUT
         return context_data
 
+
+@never_cache
+def metricsView(request):
+    '''
+    The metrics of the last refresh in the Prometheus text format. They are
+        only served when METRICS_TOKEN is set, to requests that send it as a
+        bearer token.
+    '''
+    if not settings.METRICS_TOKEN:
+        raise Http404
+    if not constant_time_compare(request.META.get('HTTP_AUTHORIZATION', ''), 'Bearer ' + settings.METRICS_TOKEN):
+        return HttpResponseForbidden()
+    return HttpResponse(renderPrometheus(lastMetrics()), content_type='text/plain; version=0.0.4; charset=utf-8')